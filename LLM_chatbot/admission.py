@@ -0,0 +1,193 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+
+_deadline = contextvars.ContextVar("chatbot_deadline", default=None)
+
+
+class Overloaded(Exception):
+    """Refused without queueing: too many requests in flight, or a stage's wait queue is full."""
+
+    def __init__(self, stage, retry_after=1):
+        super().__init__(f"{stage} is at capacity")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time while waiting for, or running, a stage."""
+
+    def __init__(self, stage):
+        super().__init__(f"request deadline passed in {stage}")
+        self.stage = stage
+
+
+def remaining():
+    """Seconds left before the current request's deadline; None if it has none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def deadline_scope(seconds):
+    """Give the code inside (and tasks it starts) a deadline `seconds` from now; None for none."""
+    token = _deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class Stage:
+    """At most `limit` callers inside a stage at once and at most `max_waiting` queued for it.
+
+    A caller that would be queued behind a full wait queue gets Overloaded straight away
+    instead of joining it; a queued caller gives up with DeadlineExceeded when its
+    request's deadline passes.
+    """
+
+    def __init__(self, name, limit, max_waiting):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.counters = Counter()
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.semaphore.locked():
+            if self.waiting >= self.max_waiting:
+                self.counters["rejected"] += 1
+                raise Overloaded(self.name)
+            self.counters["queued"] += 1
+        timeout = remaining()
+        if timeout is not None and timeout <= 0:
+            self.counters["deadline_exceeded"] += 1
+            raise DeadlineExceeded(self.name)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.counters["deadline_exceeded"] += 1
+            raise DeadlineExceeded(self.name) from None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.counters["entered"] += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+
+    def stats(self):
+        return {**self.counters, "limit": self.limit, "max_waiting": self.max_waiting,
+                "active": self.active, "waiting": self.waiting}
+
+
+class AdmissionControl:
+    """Request admission, per-stage concurrency limits and a bounded pool for blocking work.
+
+    admit() refuses a request outright once max_in_flight are being served, so overload
+    turns into fast 503s instead of an ever-growing backlog. Inside the pipeline each
+    stage (`stages` maps name -> (limit, max_waiting)) has its own limit, so a pile-up in
+    front of the LLM never holds up requests answered by a cache or the FAQ index.
+    Blocking calls (SQLite, similarity search) run on a ThreadPoolExecutor of
+    `threads` threads via run(), never on the event loop.
+    """
+
+    def __init__(self, stages, threads=8, max_in_flight=256, deadline_s=30.0):
+        self.stages = {name: Stage(name, limit, max_waiting) for name, (limit, max_waiting) in stages.items()}
+        self.threads = threads
+        self.max_in_flight = max_in_flight
+        self.deadline_s = deadline_s
+        self.in_flight = 0
+        self.counters = Counter()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="pipeline")
+        return self._executor
+
+    def admit(self):
+        """Count a request in, or raise Overloaded; pair with release()."""
+        if self.in_flight >= self.max_in_flight:
+            self.counters["rejected"] += 1
+            raise Overloaded("server")
+        self.in_flight += 1
+        self.counters["admitted"] += 1
+
+    def release(self):
+        self.in_flight -= 1
+
+    @contextmanager
+    def request(self):
+        """admit() plus the request deadline, for handlers that finish within one call."""
+        self.admit()
+        try:
+            with deadline_scope(self.deadline_s):
+                yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def stage(self, name):
+        """Hold a slot in stage `name` for an async body, which is cancelled at the request deadline."""
+        async with self.stages[name].slot():
+            timeout = remaining()
+            if timeout is None:
+                yield
+                return
+            # What asyncio.timeout() does on 3.11+: cancel this task when the deadline passes
+            task = asyncio.current_task()
+            expired = []
+
+            def expire():
+                expired.append(True)
+                task.cancel()
+
+            handle = asyncio.get_running_loop().call_later(max(timeout, 0), expire)
+            try:
+                yield
+            except asyncio.CancelledError:
+                if not expired:
+                    raise
+                self.stages[name].counters["deadline_exceeded"] += 1
+                raise DeadlineExceeded(name) from None
+            finally:
+                handle.cancel()
+
+    async def run(self, stage, fn, *args):
+        """fn(*args) on the pool, inside `stage`. Spans and the deadline carry over to the thread.
+
+        The deadline is checked before the call starts; once running, it is not abandoned
+        (a thread can't be interrupted), so slow statements need their own limit.
+        """
+        async with self.stages[stage].slot():
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(self.executor, context.run, fn, *args)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "deadline_s": self.deadline_s,
+            "stages": {name: stage.stats() for name, stage in self.stages.items()},
+        }
@@ -1,14 +1,34 @@
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-import sqlite3, re, os, datetime
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
-import requests
+import re, os, datetime
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
 import traceback
-import tempfile
+from db import Database
+from faq_store import FaqEmbeddingStore, init_faq_store
+from ollama_client import OllamaClient
+from fast_router import FastRouter
+from chat_log_writer import ChatLogWriter
+import chat_log_export
+from response_cache import CACHED_TABLES, ResponseCache
+from sql_plan_cache import SqlPlanCache
+from session_store import make_session_store
+from embedding_batcher import EmbeddingBatcher
+from embedding_backend import load_embedding_model, model_key
+from search_index import init_search_index, search_products
+from sql_guard import QueryResult, SqlGuard, SqlRejected, check_shape
+from admission import AdmissionControl, DeadlineExceeded, Overloaded, deadline_scope
+import metrics
+from metrics import span, timed
+
+_imports_done = time.perf_counter()
 
 app = FastAPI()
 app.add_middleware(
@@ -20,118 +40,308 @@ app.add_middleware(
 )
 
 DB_FILE = "order_management.db"
-chat_memory = {}
-embed_model = SentenceTransformer("all-MiniLM-L6-v2")
+db = Database(DB_FILE, busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")))
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+# "torch" (SentenceTransformer), or "onnx" / "onnx-int8" from the files export_onnx.py writes
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR")
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0")) or None  # intra-op threads; None = runtime default
+# "lazy": answer /health immediately and warm up in the background; "eager": warm up at import
+STARTUP_MODE = os.getenv("CHATBOT_STARTUP_MODE", "lazy")
+embed_model = None
+ollama = OllamaClient(max_concurrency=int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4")))
+# One LLM call returning intent + SQL instead of classify_intent followed by generate_sql_from_prompt
+COMBINED_LLM = os.getenv("CHATBOT_COMBINED_LLM", "1") == "1"
+INTENT_LABELS = ("product_info", "order_status", "faq", "greeting", "goodbye", "unknown")
+# Intents answered from a table; the others get a canned reply and never need SQL
+SQL_INTENTS = ("product_info", "order_status", "faq")
+SMALL_TALK_REPLIES = {
+    "greeting": "Hello! How can I assist you today?",
+    "goodbye": "Goodbye! Feel free to come back if you have more questions.",
+    "unknown": "I'm not sure how to help with that. Could you please rephrase?",
+}
+
+startup_timings = {}
+warm_up_lock = threading.Lock()
+ready_event = threading.Event()
+warm_up_error = None
+
+@contextmanager
+def startup_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+startup_timings["import_app_dependencies"] = round((_imports_done - _import_started) * 1000, 1)
 
 # 🛠 Create embedded DB chat log table
 def init_db():
-    with sqlite3.connect(DB_FILE) as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS chat_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT,
-                timestamp TEXT,
-                user_query TEXT,
-                bot_response TEXT
-            )
-        """)
-
-init_db()
-
-def load_faq_embeddings():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT question, keywords, answer FROM faq")
-    faq_raw = cursor.fetchall()
-    conn.close()
-
-    faq_list = []
-    for question, keywords, answer in faq_raw:
-        combined = f"{question} {keywords}".strip()
-        embedding = embed_model.encode(combined)
-        faq_list.append({
-            "question": question,
-            "keywords": keywords,
-            "answer": answer,
-            "embedding": embedding
-        })
-    return faq_list
-
-faq_embeddings = load_faq_embeddings()
-
-def rag_retrieve_faq(user_query, threshold=0.7):
-    user_embedding = embed_model.encode(user_query)
-    similarities = [
-        (faq, cosine_similarity([user_embedding], [faq["embedding"]])[0][0])
-        for faq in faq_embeddings
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS chat_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            timestamp TEXT,
+            user_query TEXT,
+            bot_response TEXT
+        )
+    """)
+    db.execute(chat_log_export.INDEX_SQL)
+    init_faq_store(db)
+    init_search_index(db)
+    session_store.init()
+
+def load_embed_model():
+    global embed_model
+    # The backends pull in torch or onnxruntime; keep them off the import path
+    with startup_stage("load_embed_model"):
+        embed_model = load_embedding_model(EMBED_BACKEND, EMBED_MODEL_NAME, ONNX_MODEL_DIR, threads=EMBED_THREADS)
+    return embed_model
+
+def encode_faq_texts(texts):
+    return embed_model.encode(texts, batch_size=64, convert_to_numpy=True)
+
+def encode_query_batch(texts):
+    return embed_model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+# Query embeddings from concurrent requests are encoded together, off the event loop
+embed_batcher = EmbeddingBatcher(
+    encode_query_batch,
+    max_batch_size=int(os.getenv("EMBED_BATCH_SIZE", "32")),
+    max_wait_ms=float(os.getenv("EMBED_BATCH_WAIT_MS", "2")),
+)
+metrics.gauge("chatbot_embedding_queue_depth", "Texts waiting for the embedding batcher.", embed_batcher.queue.qsize)
+
+faq_store = FaqEmbeddingStore(db, model_key(EMBED_BACKEND, EMBED_MODEL_NAME), encode_faq_texts)
+router = FastRouter(db)
+# LLM-written SQL runs read-only, on the cached tables only, under a time budget and a row cap
+sql_guard = SqlGuard(
+    db,
+    CACHED_TABLES,
+    timeout_ms=int(os.getenv("SQL_TIMEOUT_MS", "250")),
+    max_rows=int(os.getenv("SQL_MAX_ROWS", "50")),
+    scan_row_limit=int(os.getenv("SQL_SCAN_ROW_LIMIT", "50000")),
+)
+sql_plan_cache = SqlPlanCache(db, entity_source=router, run_query=sql_guard.run)
+chat_log_writer = ChatLogWriter(
+    db,
+    batch_size=int(os.getenv("CHAT_LOG_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("CHAT_LOG_FLUSH_INTERVAL", "0.5")),
+    max_queue=int(os.getenv("CHAT_LOG_MAX_QUEUE", "10000")),
+    policy=os.getenv("CHAT_LOG_OVERFLOW_POLICY", "drop_oldest"),
+)
+CHAT_LOG_MAX_PAGE = int(os.getenv("CHAT_LOG_MAX_PAGE", "1000"))
+PRODUCT_SEARCH_LIMIT = int(os.getenv("PRODUCT_SEARCH_LIMIT", "10"))
+# Blocking pipeline work (SQLite, similarity search) runs on PIPELINE_THREADS threads, never on
+# the event loop. Each stage is capped at (concurrency, queue length); a caller that finds the
+# queue full gets a 503 right away, and a request still running after REQUEST_DEADLINE_S gets a 504.
+admission = AdmissionControl(
+    {
+        "cpu": (int(os.getenv("PIPELINE_THREADS", "8")), int(os.getenv("PIPELINE_MAX_QUEUE", "256"))),
+        "embed": (int(os.getenv("EMBED_MAX_CONCURRENCY", "64")), int(os.getenv("EMBED_MAX_QUEUE", "256"))),
+        "llm": (int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4")), int(os.getenv("LLM_MAX_QUEUE", "16"))),
+    },
+    threads=int(os.getenv("PIPELINE_THREADS", "8")),
+    max_in_flight=int(os.getenv("MAX_IN_FLIGHT", "512")),
+    deadline_s=float(os.getenv("REQUEST_DEADLINE_S", "60")),
+)
+BUSY_REPLY = "⚠️ The assistant is busy right now. Please try again in a moment."
+TIMEOUT_REPLY = "⚠️ That took too long to answer. Please try again."
+# Per-stage timings as a Server-Timing header (and in the stream's done event)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+tracer = metrics.Tracer(
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0")),
+    log_file=os.getenv("TRACE_LOG_FILE", "traces.jsonl"),
+)
+# Conversation memory: "memory" is per process, "sqlite" is shared by all workers
+session_store = make_session_store(
+    os.getenv("SESSION_STORE", "memory"),
+    db,
+    max_turns=int(os.getenv("SESSION_MAX_TURNS", "20")),
+    ttl=float(os.getenv("SESSION_TTL", "1800")),
+    max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(8 * 1024 * 1024))),
+)
+# Recent turns prepended to LLM prompts so follow-ups have context; 0 keeps prompts stateless
+SESSION_PROMPT_TURNS = int(os.getenv("SESSION_PROMPT_TURNS", "0"))
+response_cache = ResponseCache(
+    db,
+    max_entries=int(os.getenv("RESPONSE_CACHE_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("RESPONSE_CACHE_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "600")),
+    similarity=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95")),
+    entity_source=router,
+)
+metrics.gauge("chatbot_chat_log_queue_depth", "Chat log rows waiting to be written.", chat_log_writer.queue.qsize)
+metrics.gauge("chatbot_response_cache_entries", "Replies held by the response cache.", lambda: len(response_cache.entries))
+metrics.gauge("chatbot_requests_in_flight", "Chat requests admitted and not yet answered.", lambda: admission.in_flight)
+metrics.gauge("chatbot_llm_queue_depth", "Requests waiting for an LLM slot.", lambda: admission.stages["llm"].waiting)
+metrics.gauge("chatbot_sql_plans", "Question templates with a cached SQL plan.", lambda: len(sql_plan_cache.plans))
+
+def warm_up():
+    """Run the heavy initialization once; concurrent callers wait for the first one."""
+    global warm_up_error
+    if ready_event.is_set():
+        return
+    with warm_up_lock:
+        if ready_event.is_set():
+            return
+        started = time.perf_counter()
+        try:
+            with startup_stage("init_db"):
+                init_db()
+            load_embed_model()
+            with startup_stage("faq_sync"):
+                faq_store.sync()
+            with startup_stage("router_load"):
+                router.load()
+        except Exception as e:
+            warm_up_error = repr(e)
+            traceback.print_exc()
+            raise
+        startup_timings["warm_up_total"] = round((time.perf_counter() - started) * 1000, 1)
+        warm_up_error = None
+        ready_event.set()
+        print("Startup timings (ms):", startup_timings)
+
+def warm_up_in_background():
+    try:
+        warm_up()
+    except Exception:
+        pass  # recorded in warm_up_error; the next request retries
+
+def embed_query(text):
+    warm_up()
+    return embed_batcher.encode(text)
+
+async def embed_query_async(text):
+    warm_up()
+    return await embed_batcher.encode_async(text)
+
+def rag_retrieve_faq(user_query, threshold=0.7, top_k=1, user_embedding=None):
+    """Return up to top_k FAQ matches scoring at least threshold, best first."""
+    if user_embedding is None:
+        user_embedding = embed_query(user_query)
+    return [
+        {"question": faq["question"], "answer": faq["answer"], "score": score}
+        for faq, score in faq_store.get_index().search(user_embedding, top_k=top_k, threshold=threshold)
     ]
-    best_match, best_score = max(similarities, key=lambda x: x[1])
-    return best_match["answer"] if best_score >= threshold else None
 
-def query_llama(prompt):
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={"model": "llama2", "prompt": prompt, "stream": False}
-    )
-    return response.json()["response"]
+async def query_llama(prompt):
+    async with admission.stage("llm"):
+        return await ollama.generate(prompt)
 
-def classify_intent(user_input):
+async def stream_llama(prompt, on_token):
+    """Like query_llama, but hands each token to on_token as soon as it arrives."""
+    tokens = []
+    async with admission.stage("llm"):
+        async for token in ollama.stream(prompt):
+            tokens.append(token)
+            await on_token(token)
+    return "".join(tokens)
+
+async def classify_intent(user_input, history=""):
     system_prompt = "Classify the user's intent as one of the following: product_info, order_status, faq, greeting, goodbye, unknown. Only return the label."
-    prompt = f"{system_prompt}\nUser: {user_input}\nIntent:"
-    return query_llama(prompt).strip().lower()
+    prompt = f"{system_prompt}\n{history}User: {user_input}\nIntent:"
+    metrics.LLM_CALLS.inc("classify_intent")
+    with span("llm_classify_intent"):
+        return (await query_llama(prompt)).strip().lower()
 
-def generate_sql_from_prompt(user_prompt, intent):
+async def generate_sql_from_prompt(user_prompt, intent, on_token=None, history=""):
     prompt = f"""You're an expert SQL assistant. Generate a clean SQLite SQL query for table `{intent}` based on the user's question. Do NOT include markdown or formatting.
 
-User: {user_prompt}
+{history}User: {user_prompt}
 SQL:"""
-    raw_sql = query_llama(prompt)
+    metrics.LLM_CALLS.inc("generate_sql")
+    with span("llm_generate_sql"):
+        raw_sql = await (stream_llama(prompt, on_token) if on_token else query_llama(prompt))
     cleaned_sql = re.sub(r"```(?:sql)?", "", raw_sql).strip("` \n")
     return cleaned_sql
 
-def run_sql(query, table):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+# Labels may come wrapped in markdown (**INTENT:** order_status); the SQL ends at its first
+# semicolon outside a string literal, a blank line or a code fence, so trailing prose is dropped
+INTENT_LINE_RE = re.compile(r"\bintent[`*_\s]*[:=][`*_'\"\s]*([a-z_]+)", re.IGNORECASE)
+SQL_LINE_RE = re.compile(
+    r"\bsql[`*_\s]*:[*_\s]*(?:`+(?:sql\b)?\s*)?((?:'(?:[^']|'')*'|[^';`])+?)\s*(?:;|\n\s*\n|`|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+def parse_intent_and_sql(raw):
+    """Parse an `INTENT: <label>` / `SQL: <query>` answer; returns (intent, sql) with either left None if unusable.
+
+    `SQL: NONE` is the expected answer for intents outside SQL_INTENTS and parses to sql=None,
+    as does anything that is not a single SELECT.
+    """
+    intent_match = INTENT_LINE_RE.search(raw)
+    intent = intent_match.group(1).lower() if intent_match else None
+    if intent not in INTENT_LABELS:
+        intent = None
+
+    sql = None
+    sql_match = SQL_LINE_RE.search(raw)
+    if sql_match:
+        try:
+            sql = check_shape(sql_match.group(1))
+        except SqlRejected:
+            pass
+    return intent, sql
+
+async def classify_and_generate_sql(user_input, on_token=None, history=""):
+    """Intent and SQL from a single LLM call, falling back to the two-call path for whatever fails to parse."""
+    prompt = f"""Classify the user's intent as one of the following: {", ".join(INTENT_LABELS)}.
+If the intent is product_info, order_status or faq, also write one clean SQLite SQL query on the table with that name that answers the question. Do NOT include markdown or formatting.
+Answer in exactly this format:
+INTENT: <label>
+SQL: <query, or NONE>
+
+{history}User: {user_input}
+"""
+    metrics.LLM_CALLS.inc("classify_and_generate_sql")
+    with span("llm_classify_and_generate_sql"):
+        raw = await (stream_llama(prompt, on_token) if on_token else query_llama(prompt))
+    intent, sql = parse_intent_and_sql(raw)
+    if intent is None:
+        intent = await classify_intent(user_input, history)
+    if intent in SQL_INTENTS and sql is None:
+        sql = await generate_sql_from_prompt(user_input, intent, on_token=on_token, history=history)
+    return intent, sql
+
+def run_sql(query, table, params=(), guarded=True):
+    """Execute query; guarded (the default for LLM-written SQL) goes through sql_guard.
+
+    When the statement fails and a fallback search answers instead, the rows come back as a
+    QueryResult with fallback set.
+    """
     try:
         print("Executing SQL:", query)
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        col_names = [desc[0] for desc in cursor.description]
-        return [dict(zip(col_names, row)) for row in rows]
+        with span("sql"):
+            if guarded:
+                return sql_guard.run(query, params)
+            return db.query_dicts(query, params)
     except Exception as e:
         print("SQL Error:", e)
+        metrics.SQL_ERRORS.inc(table)
         if table == "product_info":
-            return run_fallback_product_search(query)
+            metrics.FALLBACKS.inc(table)
+            return fallback_result(timed("fallback_search", run_fallback_product_search, query))
         elif table == "order_status":
-            return run_fallback_order_search(query)
+            metrics.FALLBACKS.inc(table)
+            return fallback_result(timed("fallback_search", run_fallback_order_search, query))
         return [{"error": f"SQL execution failed: {str(e)}"}]
-    finally:
-        conn.close()
+
+def fallback_result(rows):
+    results = QueryResult(rows)
+    results.fallback = True
+    return results
 
 def run_fallback_product_search(prompt):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    keywords = re.findall(r'\b\w+\b', prompt.lower())
-    cursor.execute("SELECT * FROM product_info")
-    results = cursor.fetchall()
-    cols = [desc[0] for desc in cursor.description]
-    matched = [dict(zip(cols, r)) for r in results if any(k in str(r).lower() for k in keywords)]
-    conn.close()
-    return matched
+    return search_products(db, prompt, limit=PRODUCT_SEARCH_LIMIT)
 
 def run_fallback_order_search(prompt):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
     order_id = re.search(r'\bORD\d+\b', prompt, re.IGNORECASE)
-    if order_id:
-        order_id_val = order_id.group().upper()
-        cursor.execute("SELECT * FROM order_status WHERE UPPER(order_id) = ?", (order_id_val,))
-        rows = cursor.fetchall()
-        col_names = [desc[0] for desc in cursor.description]
-        conn.close()
-        return [dict(zip(col_names, row)) for row in rows]
-    conn.close()
-    return []
+    if not order_id:
+        return []
+    return db.query_dicts("SELECT * FROM order_status WHERE UPPER(order_id) = ?", (order_id.group().upper(),))
 
 def format_response_naturally(results):
     if not results:
@@ -143,89 +353,327 @@ def format_response_naturally(results):
     lines.append("-" * len(lines[0]))
     for row in results:
         lines.append(" | ".join(str(v) for v in row.values()))
+    if getattr(results, "truncated", False):
+        lines.append(f"(showing the first {len(results)} results; ask a more specific question to narrow them down)")
     return "\n".join(lines)
 
 def log_chat(user, query, response):
     now = datetime.datetime.now().isoformat()
-    with sqlite3.connect(DB_FILE) as conn:
-        conn.execute(
-            "INSERT INTO chat_log (session_id, timestamp, user_query, bot_response) VALUES (?, ?, ?, ?)",
-            (user, now, query, response)
-        )
+    chat_log_writer.submit(user, now, query, response)
+
+def record_answer(source):
+    metrics.ANSWERS.inc(source)
+    metrics.annotate(source=source)
 
 class ChatRequest(BaseModel):
     session_id: str
     prompt: str
     language: str = "en"
 
-@app.post("/chat")
-async def chat(req: ChatRequest):
-    try:
-        user_input = req.prompt
-        user_id = req.session_id
+# The blocking steps of the pipeline are grouped into a few plain functions, each run in
+# one hop on the admission pool; answer_query and answer_with_retrieval_or_llm only await.
 
-        if re.search(r'\b(hi|hello|hey)\b', user_input.lower()):
-            reply = "Hello! How can I assist you today?"
+def answer_fast_path(user_input):
+    """Greeting or exact response cache reply; None when retrieval or the LLM is needed."""
+    if re.search(r'\b(hi|hello|hey)\b', user_input.lower()):
+        record_answer("greeting")
+        return "Hello! How can I assist you today?"
+    if (cached := timed("response_cache", response_cache.get, user_input)) is not None:
+        record_answer("response_cache")
+        return cached
+    return None
+
+def answer_from_index(user_input, query_embedding):
+    """Semantic cache, FAQ retrieval, the fast router, then the SQL plan cache: (reply, cache_tables), or None on a miss.
+
+    The router comes after FAQ retrieval so policy questions that mention an order ID or
+    product ("cancel my order ORD1234") get the FAQ answer rather than a table row.
+    """
+    cached = timed("semantic_cache", response_cache.get_similar, user_input, query_embedding)
+    if cached is not None:
+        record_answer("semantic_cache")
+        return cached, None
+    rag_matches = timed("faq_retrieval", rag_retrieve_faq, user_input, user_embedding=query_embedding)
+    if rag_matches:
+        record_answer("faq")
+        return rag_matches[0]["answer"], ("faq",)
+    if (route := timed("router", router.route, user_input)) is not None:
+        reply = timed("format_response", format_response_naturally, run_sql(route.sql, route.intent, route.params, guarded=False))
+        record_answer("router")
+        return reply, None
+    if (planned := timed("sql_plan_cache", sql_plan_cache.lookup, user_input)) is not None:
+        plan, params = planned
+        results = run_sql(plan.sql, plan.intent, params)
+        reply = timed("format_response", format_response_naturally, results)
+        record_answer("sql_plan_cache")
+        if results and "error" in results[0]:
+            return reply, None
+        return reply, {plan.intent} | {t for t in CACHED_TABLES if t in plan.sql}
+    return None
+
+def answer_from_sql(user_input, intent, sql, history):
+    """Run LLM-written SQL and format it: (reply, cache_tables)."""
+    results = run_sql(sql, intent)
+    reply = timed("format_response", format_response_naturally, results)
+    record_answer("llm")
+    # SQL shaped by earlier turns is not a function of this text alone: neither cache it nor learn a plan
+    if history or (results and "error" in results[0]):
+        return reply, None
+    # Rows from a fallback search are not what the SQL returns, so there is no plan to learn
+    if not getattr(results, "fallback", False):
+        timed("sql_plan_learn", sql_plan_cache.learn, user_input, intent, sql, results)
+    return reply, {intent} | {t for t in CACHED_TABLES if t in sql}
+
+def record_turn(user_id, user_input, reply):
+    timed("session_store", session_store.append, user_id, user_input, reply)
+    timed("log_chat", log_chat, user_id, user_input, reply)
+
+async def answer_query(user_input, user_id, on_token=None):
+    """Run the chat pipeline for one message; on_token receives LLM tokens when streaming."""
+    if not ready_event.is_set():
+        await asyncio.to_thread(warm_up)
+
+    reply = await admission.run("cpu", answer_fast_path, user_input)
+    if reply is None:
+        reply = await answer_with_retrieval_or_llm(user_input, user_id, on_token)
+
+    await admission.run("cpu", record_turn, user_id, user_input, reply)
+    return reply
+
+async def embed_query_limited(user_input):
+    with span("embed"):
+        async with admission.stage("embed"):
+            return await embed_query_async(user_input)
+
+async def answer_with_retrieval_or_llm(user_input, user_id, on_token=None):
+    """Semantic cache, FAQ retrieval, fast router, SQL plan cache, then the LLM; all share one query embedding."""
+    snapshot, query_embedding = await asyncio.gather(
+        admission.run("cpu", response_cache.snapshot),
+        embed_query_limited(user_input),
+    )
+    found = await admission.run("cpu", answer_from_index, user_input, query_embedding)
+    if found is not None:
+        reply, cache_tables = found
+    else:
+        history = await admission.run("cpu", session_store.window, user_id, SESSION_PROMPT_TURNS) if SESSION_PROMPT_TURNS else ""
+        llm_started = time.perf_counter()
+        if COMBINED_LLM:
+            intent, sql = await classify_and_generate_sql(user_input, on_token=on_token, history=history)
+        else:
+            intent = await classify_intent(user_input, history)
+            sql = None
+        if intent not in SQL_INTENTS:
+            reply = SMALL_TALK_REPLIES.get(intent, SMALL_TALK_REPLIES["unknown"])
+            cache_tables = None if history else ()
+            record_answer("llm_unknown" if reply == SMALL_TALK_REPLIES["unknown"] else "llm_small_talk")
         else:
-            rag_answer = rag_retrieve_faq(user_input)
-            if rag_answer:
-                reply = rag_answer
-            else:
-                intent = classify_intent(user_input)
-                if intent == "unknown":
-                    reply = "I'm not sure how to help with that. Could you please rephrase?"
-                else:
-                    sql = generate_sql_from_prompt(user_input, intent)
-                    results = run_sql(sql, intent)
-                    reply = format_response_naturally(results)
-
-        chat_memory.setdefault(user_id, []).append((user_input, reply))
-        log_chat(user_id, user_input, reply)
-
-        return {"response": reply}
+            if sql is None:
+                sql = await generate_sql_from_prompt(user_input, intent, on_token=on_token, history=history)
+            sql_plan_cache.record_llm_time(time.perf_counter() - llm_started)
+            reply, cache_tables = await admission.run("cpu", answer_from_sql, user_input, intent, sql, history)
+
+    if cache_tables is not None:
+        await admission.run(
+            "cpu", timed, "response_cache_put", response_cache.put, user_input, reply, cache_tables, query_embedding, snapshot
+        )
+    return reply
+
+def rejection_reply(e):
+    """Count an admission rejection; (reply text, HTTP status) for it."""
+    if isinstance(e, Overloaded):
+        metrics.REJECTIONS.inc(e.stage, "overloaded")
+        return BUSY_REPLY, 503
+    metrics.REJECTIONS.inc(e.stage, "deadline")
+    return TIMEOUT_REPLY, 504
+
+def rejection_response(e):
+    reply, status = rejection_reply(e)
+    headers = {"Retry-After": str(e.retry_after)} if status == 503 else None
+    return JSONResponse({"response": reply}, status_code=status, headers=headers)
+
+@app.post("/chat")
+async def chat(req: ChatRequest, response: Response):
+    try:
+        with admission.request(), tracer.trace("chat") as trace:
+            reply = await answer_query(req.prompt, req.session_id)
+    except (Overloaded, DeadlineExceeded) as e:
+        return rejection_response(e)
     except Exception:
         traceback.print_exc()
         return {"response": "⚠️ Internal error occurred."}
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = trace.server_timing()
+    return {"response": reply}
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """A stream that holds an admission slot: released once the response is over, however it ended.
+
+    The body generator's own finally is not enough, since it never runs if the client is
+    gone before the first chunk (or sending the headers fails); closing it here also stops
+    a pipeline left suspended behind a hung-up client.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                await self.body_iterator.aclose()
+            finally:
+                admission.release()
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Server-sent events: `token` while the LLM generates, then `reply` chunks and a final `done`."""
+    try:
+        admission.admit()
+    except Overloaded as e:
+        return rejection_response(e)
+    events = asyncio.Queue()
+
+    async def on_token(token):
+        await events.put(sse_event("token", {"stage": "llm", "text": token}))
+
+    async def run_pipeline():
+        trace = None
+        try:
+            with deadline_scope(admission.deadline_s), tracer.trace("chat_stream") as trace:
+                reply = await answer_query(req.prompt, req.session_id, on_token=on_token)
+        except (Overloaded, DeadlineExceeded) as e:
+            reply, _ = rejection_reply(e)
+        except Exception:
+            traceback.print_exc()
+            reply = "⚠️ Internal error occurred."
+        for line in reply.splitlines(keepends=True):
+            await events.put(sse_event("reply", {"text": line}))
+        done = {"response": reply}
+        if SERVER_TIMING and trace is not None:
+            done["timings_ms"] = trace.timings_ms()
+        await events.put(sse_event("done", done))
+        await events.put(None)
+
+    async def event_stream():
+        task = asyncio.create_task(run_pipeline())
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+        finally:
+            if not task.done():
+                task.cancel()
+
+    return AdmittedStreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "message": "Service is running ✅"}
+    # Liveness only: never waits for the model, so restarts are not held up by warm-up
+    return {"status": "ok", "message": "Service is running ✅", "ready": ready_event.is_set()}
+
+@app.get("/ready")
+async def readiness_check():
+    body = {"ready": ready_event.is_set(), "startup_mode": STARTUP_MODE, "timings_ms": startup_timings}
+    if warm_up_error:
+        body["error"] = warm_up_error
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.on_event("startup")
+async def start_warm_up():
+    chat_log_writer.start()
+    if not ready_event.is_set():
+        threading.Thread(target=warm_up_in_background, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+async def close_clients():
+    await ollama.aclose()
+    chat_log_writer.stop()
+    embed_batcher.stop()
+    admission.shutdown()
+    sql_guard.close_all()
+    db.close_all()
+
+@app.get("/faq-search")
+async def faq_search(q: str, k: int = 3, threshold: float = 0.0):
+    # Never block the event loop: /health and /ready must answer while this waits on warm-up
+    if not ready_event.is_set():
+        await asyncio.to_thread(warm_up)
+    try:
+        query_embedding = await embed_query_limited(q)
+        matches = await admission.run("cpu", rag_retrieve_faq, q, threshold, k, query_embedding)
+    except Overloaded as e:
+        return rejection_response(e)
+    return {"matches": matches}
+
+@app.get("/stats")
+async def stats():
+    return {
+        "router": router.stats(),
+        "response_cache": response_cache.stats(),
+        "sql_plan_cache": sql_plan_cache.stats(),
+        "chat_log_writer": chat_log_writer.stats(),
+        "session_store": session_store.stats(),
+        "embedding_batcher": embed_batcher.stats(),
+        "sql_guard": sql_guard.stats(),
+        "admission": admission.stats(),
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
 
 @app.get("/test-db")
 async def test_database():
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            conn.execute("SELECT 1")
+        db.query_one("SELECT 1")
         return {"db_status": "connected ✅"}
     except Exception as e:
         return {"db_status": f"error ❌ - {str(e)}"}
 
+def fetch_chat_log_page(session_id, cursor, limit):
+    chat_log_writer.flush()
+    return chat_log_export.fetch_page(db, session_id, cursor, limit)
+
+def chat_log_exists(session_id):
+    chat_log_writer.flush()
+    return db.query_one("SELECT 1 FROM chat_log WHERE session_id = ? LIMIT 1", (session_id,)) is not None
+
 @app.get("/chat-log/{session_id}")
-async def get_chat_log(session_id: str):
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT timestamp, user_query, bot_response FROM chat_log WHERE session_id = ?", (session_id,))
-        rows = cursor.fetchall()
+async def get_chat_log(session_id: str, limit: int = 100, cursor: str = None):
+    limit = max(1, min(limit, CHAT_LOG_MAX_PAGE))
+    try:
+        # The flush waits on the writer thread; neither it nor the query may block /chat
+        rows, next_cursor = await asyncio.to_thread(fetch_chat_log_page, session_id, cursor, limit)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     if not rows:
-        return {"log": "No logs found for this session."}
-    log_text = "\n".join(f"[{ts}] USER: {uq}\nBOT: {br}\n" for ts, uq, br in rows)
-    return {"log": log_text}
+        return {"log": "No logs found for this session.", "entries": [], "next_cursor": None}
+    log_text = "\n".join(chat_log_export.format_txt(ts, uq, br) for _, ts, uq, br in rows)
+    entries = [{"timestamp": ts, "user_query": uq, "bot_response": br} for _, ts, uq, br in rows]
+    return {"log": log_text, "entries": entries, "next_cursor": next_cursor}
 
 @app.get("/download-chat/{session_id}")
-async def download_chat_log(session_id: str):
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT timestamp, user_query, bot_response FROM chat_log WHERE session_id = ?", (session_id,))
-        rows = cursor.fetchall()
-
-    if not rows:
+async def download_chat_log(session_id: str, format: str = "txt", gzip: bool = False):
+    if format not in chat_log_export.FORMATS:
+        return JSONResponse(status_code=400, content={"error": f"format must be one of {sorted(chat_log_export.FORMATS)}"})
+    if not await asyncio.to_thread(chat_log_exists, session_id):
         return {"message": "No chat found for this session ID."}
 
-    content = "\n".join(f"[{ts}] USER: {uq}\nBOT: {br}\n" for ts, uq, br in rows)
-    
-    # Create a temp file for download
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode="w", encoding="utf-8") as tmpfile:
-        tmpfile.write(content)
-        tmpfile_path = tmpfile.name
+    media_type, extension = chat_log_export.FORMATS[format]
+    filename = f"chat_log_{session_id}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+    # Rows go from the cursor to the socket in batches, so the export size doesn't matter
+    return StreamingResponse(
+        chat_log_export.stream_session(db, session_id, format, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+if STARTUP_MODE == "eager":
+    warm_up()
 
-    return FileResponse(tmpfile_path, filename=f"chat_log_{session_id}.txt", media_type='text/plain')
@@ -0,0 +1,77 @@
+"""Per-request SQLite overhead: a fresh connection per call (old code) vs the shared db.Database.
+
+Run from the LLM_chatbot directory; it works on a temporary copy of order_management.db:
+
+    python benchmarks/bench_db.py --iterations 5000
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import Database  # noqa: E402
+
+READ_SQL = "SELECT * FROM order_status WHERE order_id = ?"
+WRITE_SQL = "INSERT INTO bench_log (session_id, timestamp, user_query, bot_response) VALUES (?, ?, ?, ?)"
+
+
+def per_call_read(path):
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(READ_SQL, ("ORD5678",))
+        cols = [d[0] for d in cursor.description]
+        return [dict(zip(cols, r)) for r in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def per_call_write(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute(WRITE_SQL, ("bench", "now", "q", "r"))
+    conn.close()
+
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="order_management.db")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "bench.db")
+    shutil.copy(args.db, path)
+    try:
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE bench_log (session_id TEXT, timestamp TEXT, user_query TEXT, bot_response TEXT)")
+        conn.close()
+
+        results = {
+            "read, connect per call": timed(lambda: per_call_read(path), args.iterations),
+            "write, connect per call": timed(lambda: per_call_write(path), args.iterations),
+        }
+        db = Database(path)
+        results["read, shared Database"] = timed(lambda: db.query_dicts(READ_SQL, ("ORD5678",)), args.iterations)
+        results["write, shared Database"] = timed(lambda: db.execute(WRITE_SQL, ("bench", "now", "q", "r")), args.iterations)
+        db.close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, micros in results.items():
+        print(f"{name:<26} {micros:>9.1f} us/op")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Embedding backends on CPU: load time, single-query latency, batch throughput and RSS.
+
+Run from the LLM_chatbot directory after python export_onnx.py:
+
+    python benchmarks/bench_embed_backends.py
+    python benchmarks/bench_embed_backends.py --backends torch onnx-int8 --threads 1 --iterations 500
+
+Each backend is measured in its own subprocess so resident memory is not shared between
+them; rss_mb is VmRSS after loading and encoding, peak_mb the process high-water mark.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_backend import BACKENDS  # noqa: E402
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            return int(re.search(r"VmRSS:\s+(\d+)", f.read()).group(1)) / 1024
+    except (OSError, AttributeError):
+        return float("nan")
+
+
+def measure(args):
+    from embedding_backend import load_embedding_model
+
+    if args.threads:
+        os.environ.setdefault("OMP_NUM_THREADS", str(args.threads))
+    with open(args.queries, encoding="utf-8") as f:
+        queries = [q.strip() for q in re.findall(r"\] USER: (.*)", f.read()) if q.strip()]
+    queries = queries or ["What is the status of my order ORD5678?"]
+
+    start = time.perf_counter()
+    model = load_embedding_model(args.worker, args.model, args.onnx_dir, threads=args.threads)
+    load_s = time.perf_counter() - start
+    model.encode(queries[:8])  # warm up
+
+    latencies = []
+    for i in range(args.iterations):
+        start = time.perf_counter()
+        model.encode(queries[i % len(queries)])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    batch = [queries[i % len(queries)] for i in range(args.batch_size * 8)]
+    start = time.perf_counter()
+    model.encode(batch, batch_size=args.batch_size)
+    throughput = len(batch) / (time.perf_counter() - start)
+
+    return {
+        "backend": args.worker,
+        "load_s": load_s,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "batch_per_s": throughput,
+        "rss_mb": rss_mb(),
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--onnx-dir")
+    parser.add_argument("--queries", default="chat_log.txt")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, help="intra-op threads for both runtimes")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args)))
+        return
+
+    print(f"{'backend':<10} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'batch/s':>9} {'rss MB':>8} {'peak MB':>8}")
+    for backend in args.backends:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--worker", backend],
+            capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            print(f"{backend:<10} failed: {out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode}")
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{backend:<10} {r['load_s']:>7.2f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['batch_per_s']:>9.1f} {r['rss_mb']:>8.1f} {r['peak_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Query-embedding throughput and latency: one encode per request vs the EmbeddingBatcher.
+
+Run from the LLM_chatbot directory (CPU only is fine; the model is downloaded on first use):
+
+    python benchmarks/bench_embed_batching.py
+    python benchmarks/bench_embed_batching.py --concurrency 1 8 32 --wait-ms 0 2 5 --requests 512
+
+Each run fires --requests queries from `concurrency` concurrent asyncio clients, the way
+/chat does. "per_request" encodes every query on its own in a worker thread; "batched"
+goes through EmbeddingBatcher with the given max_wait_ms. Queries are the user lines
+from chat_log.txt.
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_batcher import EmbeddingBatcher  # noqa: E402
+
+
+def load_queries(path):
+    with open(path, encoding="utf-8") as f:
+        queries = re.findall(r"\] USER: (.*)", f.read())
+    return [q.strip() for q in queries if q.strip()] or ["What is the status of my order ORD5678?"]
+
+
+async def drive(encode, queries, requests, concurrency):
+    latencies = []
+    pending = iter(range(requests))
+
+    async def client():
+        for i in pending:
+            start = time.perf_counter()
+            await encode(queries[i % len(queries)])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "qps": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--queries", default="chat_log.txt")
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--wait-ms", type=float, nargs="+", default=[0.0, 2.0, 5.0])
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(args.model, device="cpu")
+    queries = load_queries(args.queries)
+    model.encode(queries[:8])  # warm up
+
+    async def per_request(text):
+        return await asyncio.to_thread(model.encode, text)
+
+    print(f"{'mode':<16} {'clients':>7} {'qps':>8} {'p50 ms':>8} {'p95 ms':>8} {'batch':>6}")
+    for concurrency in args.concurrency:
+        r = asyncio.run(drive(per_request, queries, args.requests, concurrency))
+        print(f"{'per_request':<16} {concurrency:>7} {r['qps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {1:>6.1f}")
+        for wait_ms in args.wait_ms:
+            batcher = EmbeddingBatcher(
+                lambda texts: model.encode(texts, batch_size=len(texts), convert_to_numpy=True),
+                max_batch_size=args.max_batch, max_wait_ms=wait_ms,
+            )
+            r = asyncio.run(drive(batcher.encode_async, queries, args.requests, concurrency))
+            batcher.stop()
+            mode = f"batched {wait_ms:g}ms"
+            print(f"{mode:<16} {concurrency:>7} {r['qps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                  f"{batcher.stats()['mean_batch_size']:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
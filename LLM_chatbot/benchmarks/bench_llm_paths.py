@@ -0,0 +1,160 @@
+"""Compare the two-call (classify_intent + generate_sql_from_prompt) and combined intent+SQL paths.
+
+Run from the LLM_chatbot directory:
+
+    python benchmarks/bench_llm_paths.py                      # in-process stub LLM, 0.3s per call
+    python benchmarks/bench_llm_paths.py --latency 1.5 --repeat 3
+    python benchmarks/bench_llm_paths.py --ollama-url http://localhost:11434   # real llama2
+
+Accuracy counts a query as correct when the intent matches the label and the SQL
+returns the same rows as the reference query. LLM calls is the mean number of
+generations per question; greetings and goodbyes should take one on the combined path.
+
+Before timing anything it runs app.parse_intent_and_sql over PARSE_CASES, replies shaped
+the way real models tend to answer (markdown labels, code fences, prose after the SQL),
+and exits with status 1 if any parses wrongly. A reply that parses to None falls back to
+the two-call path for that part.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from ollama_client import OllamaClient  # noqa: E402
+from stub_ollama import make_server  # noqa: E402
+
+# (question, expected intent, reference SQL)
+CORPUS = [
+    ("What is the status of my order ORD5678?", "order_status", "SELECT * FROM order_status WHERE order_id = 'ORD5678'"),
+    ("Where is order ORD1234 right now?", "order_status", "SELECT * FROM order_status WHERE order_id = 'ORD1234'"),
+    ("Has ORD4321 been delivered?", "order_status", "SELECT * FROM order_status WHERE order_id = 'ORD4321'"),
+    ("Give me the price of Galaxy S23", "product_info", "SELECT * FROM product_info WHERE name = 'Galaxy S23'"),
+    ("How much does the MacBook Pro cost?", "product_info", "SELECT * FROM product_info WHERE name = 'MacBook Pro'"),
+    ("What are the features of Pixel 8?", "product_info", "SELECT * FROM product_info WHERE name = 'Pixel 8'"),
+    ("I need tech support contact details.", "unknown", None),
+    ("Tell me a joke about databases", "unknown", None),
+    ("Good morning!", "greeting", None),
+    ("Goodbye, thanks for the help", "goodbye", None),
+    ("Ok bye", "goodbye", None),
+]
+
+# (raw combined reply, expected (intent, sql))
+PARSE_CASES = [
+    ("INTENT: order_status\nSQL: SELECT * FROM order_status WHERE order_id = 'ORD5678'",
+     ("order_status", "SELECT * FROM order_status WHERE order_id = 'ORD5678'")),
+    ("INTENT: order_status\nSQL: SELECT * FROM order_status WHERE order_id = 'ORD5678';\n\nThis query retrieves the order.",
+     ("order_status", "SELECT * FROM order_status WHERE order_id = 'ORD5678'")),
+    ("INTENT: product_info\nSQL: SELECT * FROM product_info WHERE name = 'Pixel 8'\n\nIt returns the product row.",
+     ("product_info", "SELECT * FROM product_info WHERE name = 'Pixel 8'")),
+    ("**INTENT:** order_status\n**SQL:** `SELECT * FROM order_status WHERE order_id = 'ORD1234'`",
+     ("order_status", "SELECT * FROM order_status WHERE order_id = 'ORD1234'")),
+    ("**Intent**: product_info\nSQL:\n```sql\nSELECT price FROM product_info\nWHERE name = 'Galaxy S23'\n```\nLet me know!",
+     ("product_info", "SELECT price FROM product_info\nWHERE name = 'Galaxy S23'")),
+    ("INTENT: faq\nSQL: SELECT answer FROM faq WHERE question LIKE '%return; refund%';",
+     ("faq", "SELECT answer FROM faq WHERE question LIKE '%return; refund%'")),
+    ("INTENT: greeting\nSQL: NONE", ("greeting", None)),
+    ("INTENT: order_status\nSQL: DELETE FROM order_status", ("order_status", None)),
+    ("That sounds like a question about an order.", (None, None)),
+]
+
+
+def check_parser():
+    failures = 0
+    for raw, expected in PARSE_CASES:
+        parsed = app.parse_intent_and_sql(raw)
+        if parsed != expected:
+            failures += 1
+            print(f"parse FAIL {raw!r}: got {parsed!r}, expected {expected!r}")
+    print(f"parse cases: {len(PARSE_CASES) - failures}/{len(PARSE_CASES)} correct")
+    return failures == 0
+
+
+def reference_rows(sql):
+    if sql is None:
+        return None
+    with sqlite3.connect(app.DB_FILE) as conn:
+        return sorted(conn.execute(sql).fetchall())
+
+
+def rows_for(sql):
+    try:
+        with sqlite3.connect(app.DB_FILE) as conn:
+            return sorted(conn.execute(sql).fetchall())
+    except sqlite3.Error:
+        return "error"
+
+
+async def two_call(question):
+    intent = await app.classify_intent(question)
+    sql = await app.generate_sql_from_prompt(question, intent) if intent in app.SQL_INTENTS else None
+    return intent, sql
+
+
+async def combined(question):
+    return await app.classify_and_generate_sql(question)
+
+
+async def run_path(path, repeat):
+    latencies, correct = [], 0
+    calls_before = count_llm_calls()
+    for _ in range(repeat):
+        for question, expected_intent, ref_sql in CORPUS:
+            start = time.perf_counter()
+            intent, sql = await path(question)
+            latencies.append(time.perf_counter() - start)
+            expected = reference_rows(ref_sql)
+            ok = intent == expected_intent and (expected is None or (sql is not None and rows_for(sql) == expected))
+            correct += ok
+    latencies.sort()
+    return {
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "accuracy": correct / len(latencies),
+        "calls_per_query": (count_llm_calls() - calls_before) / len(latencies),
+    }
+
+
+def count_llm_calls():
+    return sum(v for (call,), v in app.metrics.LLM_CALLS.values.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ollama-url", help="benchmark a real Ollama instead of the stub")
+    parser.add_argument("--latency", type=float, default=0.3, help="stub seconds per LLM call")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    if not check_parser():
+        sys.exit(1)
+
+    url = args.ollama_url
+    if url is None:
+        server = make_server(port=0, latency=args.latency)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+    app.ollama = OllamaClient(base_url=url)
+
+    async def run_all():
+        results = {}
+        for name, path in (("two_call", two_call), ("combined", combined)):
+            results[name] = await run_path(path, args.repeat)
+        await app.ollama.aclose()
+        return results
+
+    results = asyncio.run(run_all())
+    print(f"{'path':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'accuracy':>9} {'LLM calls':>10}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['mean_ms']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['accuracy']:>9.0%} {r['calls_per_query']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Fast-path latency under LLM overload, with admission control.
+
+Run from the LLM_chatbot directory; no llama2 is needed:
+
+    python benchmarks/bench_overload.py
+    python benchmarks/bench_overload.py --flood 200 --latency 2 --duration 20
+
+It starts the stub LLM (slow: --latency seconds per call) and the app via load_test.Stack,
+then measures probe requests that never need the LLM (greeting, router lookups, FAQ
+answers) twice: on an idle server, and while --flood clients keep sending questions
+that all go to the LLM (backing off for Retry-After when refused, as a well-behaved
+client would). With the LLM stage capped at OLLAMA_MAX_CONCURRENCY and
+LLM_MAX_QUEUE waiters, the flood should turn into fast 503s and the probe latency
+should stay close to the idle numbers.
+
+Finally it opens --disconnects /chat/stream requests and hangs up on each early (straight
+after sending the request, after the headers, or after the first event), then
+checks that the server's in-flight count goes back to zero: a leaked admission slot
+there would eventually turn every request into a 503.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import Stack, percentile  # noqa: E402
+
+PROBES = (
+    "hello",
+    "What is the status of order ORD1001?",
+    "How do I return an item?",
+    "Tell me about the Galaxy S23",
+)
+
+
+async def probe(http, duration):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    i = 0
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        response = await http.post("/chat", json={"session_id": "probe", "prompt": PROBES[i % len(PROBES)]})
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+        i += 1
+    latencies.sort()
+    return latencies, errors
+
+
+async def flood(http, stop, statuses):
+    i = 0
+    while not stop.is_set():
+        i += 1
+        try:
+            response = await http.post("/chat", json={"session_id": f"flood-{i}", "prompt": f"write me a poem about {i}"})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 503:
+                await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+
+
+async def drop_streams(url, count):
+    """Hang up on `count` /chat/stream requests before they finish."""
+    host, port = url.removeprefix("http://").split(":")
+    async with httpx.AsyncClient(base_url=url, timeout=30) as http:
+        for i in range(count):
+            body = {"session_id": f"dropped-{i}", "prompt": f"write me a poem about {i}"}
+            if i % 3:
+                async with http.stream("POST", "/chat/stream", json=body) as response:
+                    if i % 3 == 2:
+                        await response.aiter_lines().__anext__()  # first event only
+                continue
+            # Reset the connection right after the request, before the server can send headers
+            payload = json.dumps(body).encode()
+            _, writer = await asyncio.open_connection(host, int(port))
+            writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            writer.write(b"POST /chat/stream HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (host.encode(), len(payload), payload))
+            await writer.drain()
+            writer.close()
+
+
+async def in_flight(url, settle):
+    """The server's admitted-request count once it has had `settle` seconds to notice hang-ups."""
+    await asyncio.sleep(settle)
+    async with httpx.AsyncClient(base_url=url, timeout=30) as http:
+        return (await http.get("/stats")).json()["admission"]["in_flight"]
+
+
+async def measure(url, args):
+    limits = httpx.Limits(max_connections=args.flood + 1, max_keepalive_connections=args.flood + 1)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as http:
+        await probe(http, 1.0)  # warm up
+        idle, _ = await probe(http, args.duration)
+
+        stop, statuses = asyncio.Event(), {}
+        flooders = [asyncio.create_task(flood(http, stop, statuses)) for _ in range(args.flood)]
+        await asyncio.sleep(args.latency)  # let the LLM queue fill
+        loaded, errors = await probe(http, args.duration)
+        stop.set()
+        await asyncio.gather(*flooders)
+    await drop_streams(url, args.disconnects)
+    leaked = await in_flight(url, args.latency + 2)
+    return idle, loaded, errors, statuses, leaked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flood", type=int, default=64, help="concurrent clients sending LLM-bound questions")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per probe run")
+    parser.add_argument("--latency", type=float, default=1.0, help="stub seconds per LLM call")
+    parser.add_argument("--disconnects", type=int, default=30, help="/chat/stream requests to hang up on early")
+    parser.add_argument("--verbose", action="store_true", help="show stub and app output")
+    args = parser.parse_args()
+
+    stack_args = argparse.Namespace(latency=args.latency, token_delay=0.0, workers=1, verbose=args.verbose)
+    with Stack(stack_args) as stack:
+        idle, loaded, errors, statuses, leaked = asyncio.run(measure(stack.url, args))
+
+    ms = lambda values, q: f"{percentile(values, q) * 1000:.1f}" if values else "-"  # noqa: E731
+    print(f"{'probe':<12} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, values in (("idle", idle), ("overloaded", loaded)):
+        print(f"{label:<12} {len(values):>8} {ms(values, 0.5):>8} {ms(values, 0.95):>8} {ms(values, 0.99):>8}")
+    if errors:
+        print(f"probe errors under load: {errors}")
+    print("flood responses:", ", ".join(f"{status}={count}" for status, count in sorted(statuses.items(), key=str)))
+    print(f"in flight after {args.disconnects} dropped streams: {leaked} (expected 0)")
+    if leaked:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
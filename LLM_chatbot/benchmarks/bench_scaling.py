@@ -0,0 +1,178 @@
+"""Throughput and memory of serve.py from 1 to N worker processes.
+
+Run from the LLM_chatbot directory (Linux; memory figures come from /proc):
+
+    python benchmarks/bench_scaling.py                          # 1, 2, 4, ... up to the core count
+    python benchmarks/bench_scaling.py --workers 1 2 4 8 --duration 20 --concurrency 64
+
+For every worker count it starts serve.py, on a temporary copy of order_management.db,
+against an in-process stub LLM, waits for
+/ready, then drives POST /chat for --duration seconds from --concurrency async clients.
+Queries are the user lines from chat_log.txt with a counter appended, so most of them
+miss the response cache and pay for embedding and retrieval. Reported per run:
+requests/s, p50/p95 latency, speedup over one worker, and the total RSS and PSS of the
+launcher plus its workers. PSS charges each shared page to the processes sharing it,
+so a flat PSS total as workers are added shows the model and FAQ index really are shared.
+
+The load generator runs on the same machine; with many workers, pin it elsewhere
+(taskset) or its own CPU use will flatten the curve.
+"""
+import argparse
+import asyncio
+import os
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from stub_ollama import make_server  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_tree(pid):
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    return pids
+
+
+def memory_mb(pids):
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                text = f.read()
+        except OSError:
+            continue
+        rss += int(re.search(r"^Rss:\s+(\d+)", text, re.MULTILINE).group(1))
+        pss += int(re.search(r"^Pss:\s+(\d+)", text, re.MULTILINE).group(1))
+    return rss / 1024, pss / 1024
+
+
+def wait_ready(base_url, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{base_url} not ready after {timeout}s")
+
+
+async def drive(base_url, queries, duration, concurrency):
+    latencies, errors = [], 0
+    counter = iter(range(10**9))
+    deadline = time.monotonic() + duration
+
+    async def client(http):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            i = next(counter)
+            body = {"session_id": f"bench-{i % concurrency}", "prompt": f"{queries[i % len(queries)]} {i}"}
+            start = time.perf_counter()
+            try:
+                response = await http.post("/chat", json=body)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    if not latencies:
+        return {"rps": 0.0, "p50_ms": float("nan"), "p95_ms": float("nan"), "errors": errors}
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "errors": errors,
+    }
+
+
+def run(workers, args, queries, ollama_url):
+    port = free_port()
+    # Each run gets a fresh copy of the database, so chat logs, sessions and FAQ embeddings
+    # written under load never touch the repository
+    workdir = tempfile.mkdtemp(prefix="bench_scaling_")
+    shutil.copy(os.path.join(APP_DIR, "order_management.db"), workdir)
+    env = {
+        **os.environ,
+        "OLLAMA_URL": ollama_url,
+        "PYTHONPATH": os.pathsep.join(p for p in (APP_DIR, os.environ.get("PYTHONPATH")) if p),
+    }
+    if "ONNX_MODEL_DIR" not in env and os.path.isdir(os.path.join(APP_DIR, "onnx_models")):
+        env["ONNX_MODEL_DIR"] = os.path.join(APP_DIR, "onnx_models", "all-MiniLM-L6-v2")
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(APP_DIR, "serve.py"), "--workers", str(workers), "--port", str(port)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(base_url)
+        asyncio.run(drive(base_url, queries, min(2.0, args.duration), args.concurrency))  # warm up
+        result = asyncio.run(drive(base_url, queries, args.duration, args.concurrency))
+        result["rss_mb"], result["pss_mb"] = memory_mb(process_tree(proc.pid))
+        return result
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cores = os.cpu_count() or 1
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, *[2 ** i for i in range(1, cores.bit_length()) if 2 ** i <= cores], cores}))
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds per LLM call")
+    parser.add_argument("--queries", default="chat_log.txt")
+    args = parser.parse_args()
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = [q.strip() for q in re.findall(r"\] USER: (.*)", f.read()) if q.strip()]
+    server = make_server(port=0, latency=args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ollama_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{'workers':>7} {'req/s':>8} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6} {'RSS MB':>8} {'PSS MB':>8}")
+    baseline = None
+    for workers in args.workers:
+        r = run(workers, args, queries, ollama_url)
+        baseline = baseline or r["rps"]
+        speedup = r["rps"] / baseline if baseline else 0.0
+        print(f"{workers:>7} {r['rps']:>8.1f} {speedup:>7.2f}x {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['errors']:>6} {r['rss_mb']:>8.1f} {r['pss_mb']:>8.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Check that an ONNX embedding backend retrieves the same FAQ as the PyTorch model.
+
+Run from the LLM_chatbot directory after python export_onnx.py:
+
+    python benchmarks/check_embedding_parity.py                       # torch vs onnx-int8
+    python benchmarks/check_embedding_parity.py --candidate onnx
+
+Each backend runs in its own subprocess that imports app.py with EMBED_BACKEND set, warms
+it up (FaqEmbeddingStore encodes the faq table) and answers every user query in
+chat_log.txt, plus each FAQ question, with app.rag_retrieve_faq: the same code path and
+threshold as /chat. The subprocesses work on temporary copies of order_management.db, so
+the repository database and its FAQ embeddings are untouched. Exits with status 1 if any
+decision differs.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from embedding_backend import BACKENDS, ONNX_INT8, TORCH  # noqa: E402
+from faq_index import normalize_rows  # noqa: E402
+
+
+def load_queries(db_path, log_path):
+    with sqlite3.connect(db_path) as conn:
+        questions = [q for (q,) in conn.execute("SELECT question FROM faq ORDER BY id")]
+    conn.close()
+    with open(log_path, encoding="utf-8") as f:
+        queries = [q.strip() for q in re.findall(r"\] USER: (.*)", f.read()) if q.strip()]
+    return list(dict.fromkeys(queries + questions))
+
+
+def decide(args):
+    """Worker: the top FAQ (or None) per query through app.rag_retrieve_faq, plus query embeddings."""
+    import app
+
+    with open(args.worker_io, encoding="utf-8") as f:
+        queries = json.load(f)
+    app.warm_up()
+    picks = []
+    for query in queries:
+        matches = app.rag_retrieve_faq(query)
+        picks.append([matches[0]["question"], round(matches[0]["score"], 4)] if matches else [None, None])
+    np.save(args.worker_io + ".npy", np.stack([app.embed_query(q) for q in queries]))
+    app.embed_batcher.stop()
+    with open(args.worker_io, "w", encoding="utf-8") as f:
+        json.dump(picks, f)
+
+
+def run_backend(backend, args, queries):
+    workdir = tempfile.mkdtemp(prefix=f"parity_{backend}_")
+    try:
+        shutil.copy(os.path.abspath(args.db), os.path.join(workdir, "order_management.db"))
+        io_file = os.path.join(workdir, "queries.json")
+        with open(io_file, "w", encoding="utf-8") as f:
+            json.dump(queries, f)
+        env = {
+            **os.environ,
+            "EMBED_BACKEND": backend,
+            "ONNX_MODEL_DIR": os.path.abspath(args.onnx_dir or os.path.join(APP_DIR, "onnx_models", "all-MiniLM-L6-v2")),
+            "PYTHONPATH": os.pathsep.join(p for p in (APP_DIR, os.environ.get("PYTHONPATH")) if p),
+        }
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", backend, "--worker-io", io_file],
+            cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+        with open(io_file, encoding="utf-8") as f:
+            picks = json.load(f)
+        return picks, normalize_rows(np.load(io_file + ".npy"))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reference", default=TORCH, choices=BACKENDS)
+    parser.add_argument("--candidate", default=ONNX_INT8, choices=BACKENDS)
+    parser.add_argument("--onnx-dir", help="directory written by export_onnx.py (default onnx_models/all-MiniLM-L6-v2)")
+    parser.add_argument("--db", default="order_management.db")
+    parser.add_argument("--queries", default="chat_log.txt")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-io", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        decide(args)
+        return
+
+    queries = load_queries(args.db, args.queries)
+    reference, ref_vecs = run_backend(args.reference, args, queries)
+    candidate, cand_vecs = run_backend(args.candidate, args, queries)
+
+    cosines = np.sum(ref_vecs * cand_vecs, axis=1)
+    mismatches = [(q, r, c) for q, r, c in zip(queries, reference, candidate) if r[0] != c[0]]
+    print(f"{len(queries)} queries: {len(queries) - len(mismatches)} same decision, {len(mismatches)} different")
+    print(f"query embedding cosine {args.reference} vs {args.candidate}: "
+          f"min {cosines.min():.4f}, mean {cosines.mean():.4f}")
+    for query, (ref_faq, ref_score), (cand_faq, cand_score) in mismatches:
+        print(f"  {query!r}: {args.reference} -> {ref_faq!r} ({ref_score}), "
+              f"{args.candidate} -> {cand_faq!r} ({cand_score})")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Check that sql_guard.py refuses statements an LLM should never get to run.
+
+Run from the LLM_chatbot directory:
+
+    python benchmarks/check_sql_guard.py
+
+Works on a temporary copy of order_management.db, padded with enough order_status rows to
+trip the full-scan screen, and with the chat_log and session tables in place. Every
+statement in REJECTED must raise SqlRejected and every one in ALLOWED must run; the
+script exits with status 1 and lists the offenders otherwise.
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import Database  # noqa: E402
+from response_cache import CACHED_TABLES  # noqa: E402
+from session_store import SqliteSessionStore  # noqa: E402
+from sql_guard import SqlGuard, SqlRejected  # noqa: E402
+
+SCAN_ROW_LIMIT = 1000
+
+# (statement, why it must be refused)
+REJECTED = [
+    ("DELETE FROM order_status", "write"),
+    ("DROP TABLE faq", "DDL"),
+    ("SELECT * FROM product_info; DROP TABLE faq", "second statement"),
+    ("SELECT * FROM product_info; -- note\nDELETE FROM faq", "second statement after a comment"),
+    ("PRAGMA table_info(order_status)", "pragma"),
+    ("ATTACH DATABASE 'x.db' AS x", "attach"),
+    ("SELECT * FROM chat_log", "table outside the allowlist"),
+    ("SELECT * FROM sqlite_master", "schema table"),
+    ("SELECT * FROM pragma_table_info('order_status')", "pragma function"),
+    ("WITH chat_log AS (SELECT 1) SELECT session_id, user_query FROM main.chat_log", "CTE shadowing chat_log"),
+    ("WITH session_turn AS (SELECT 1) SELECT * FROM main.session_turn", "CTE shadowing session_turn"),
+    ("WITH RECURSIVE chat_log(n) AS (SELECT 1) SELECT * FROM main.chat_log", "recursive CTE shadowing chat_log"),
+    ("WITH x AS MATERIALIZED (SELECT * FROM chat_log) SELECT * FROM x", "CTE over chat_log"),
+    ("SELECT * FROM product_info WHERE product_id IN (SELECT session_id FROM chat_log)", "subquery on chat_log"),
+    ("SELECT zeroblob(100000000)", "blob allocation"),
+    ("SELECT load_extension('x')", "extension loading"),
+    ("WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r) SELECT n FROM r LIMIT -1 OFFSET 1000000000",
+     "runaway recursion (time budget)"),
+    ("SELECT * FROM order_status", "full scan of a large table"),
+    ("SELECT * FROM order_status o WHERE o.status = 'Shipped'", "aliased full scan"),
+]
+
+ALLOWED = [
+    "SELECT * FROM order_status WHERE order_id = 'ORD1234'",
+    "SELECT * FROM product_info WHERE price < 80000",
+    "SELECT question, answer FROM faq",
+    "WITH cheap AS (SELECT * FROM product_info WHERE price < 80000) SELECT name FROM cheap",
+    "SELECT * FROM support_contacts WHERE department = 'Sales';",
+    "SELECT * FROM order_status WHERE order_id = 'ORD1234'; -- the order the user asked about",
+    "SELECT name FROM product_info WHERE name LIKE '%;%'; /* names with a semicolon */ ;\n",
+    "-- cheapest first\nSELECT name FROM product_info ORDER BY price LIMIT 3;",
+]
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="check_sql_guard_")
+    try:
+        shutil.copy("order_management.db", workdir)
+        db = Database(os.path.join(workdir, "order_management.db"))
+        SqliteSessionStore(db).init()
+        with db.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO order_status (order_id, customer_name, status) VALUES (?, ?, ?)",
+                [(f"ORDX{i}", f"Customer {i}", "Shipped") for i in range(SCAN_ROW_LIMIT * 2)],
+            )
+        guard = SqlGuard(db, CACHED_TABLES, timeout_ms=100, scan_row_limit=SCAN_ROW_LIMIT)
+
+        failures = []
+        for sql, why in REJECTED:
+            try:
+                guard.run(sql)
+                failures.append(f"ran, should be refused ({why}): {sql}")
+            except SqlRejected as e:
+                print(f"refused  {e.reason:<20} {why}")
+            except sqlite3.Error as e:
+                print(f"error    {type(e).__name__:<20} {why}: {e}")
+        for sql in ALLOWED:
+            try:
+                print(f"allowed  {len(guard.run(sql)):>4} rows            {sql}")
+            except sqlite3.Error as e:
+                failures.append(f"refused, should run ({e}): {sql}")
+        guard.close_all()
+        db.close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for failure in failures:
+        print("FAIL", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
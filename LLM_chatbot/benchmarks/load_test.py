@@ -0,0 +1,291 @@
+"""Offline load test: app.py against the stub Ollama, replaying a query corpus.
+
+Run from the LLM_chatbot directory; no llama2 is needed:
+
+    python benchmarks/load_test.py                                   # 500 requests, 16 clients
+    python benchmarks/load_test.py --concurrency 64 --duration 60 --latency 0.5
+    python benchmarks/load_test.py --workers 4                       # serve.py instead of uvicorn
+    python benchmarks/load_test.py --url http://localhost:8000       # an app that is already running
+    python benchmarks/load_test.py --compare benchmarks/results/load_test-<old>.json
+
+It starts stub_ollama.py and the app in subprocesses (the app works on a copy of
+order_management.db in a temporary directory, so the repository database is untouched),
+replays the user lines of chat_log.txt from --concurrency clients and reports
+p50/p95/p99 latency, requests/s, the per-stage breakdown from the Server-Timing header
+and the mix of answer sources from /metrics. Everything is also written as JSON to
+--out (default benchmarks/results/load_test-<commit>-<time>.json); --compare prints
+the change against an earlier result file.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        queries = [q.strip() for q in re.findall(r"\] USER: (.*)", f.read()) if q.strip()]
+    if not queries:
+        sys.exit(f"no 'USER:' lines found in {path}")
+    return queries
+
+
+def parse_server_timing(header):
+    stages = {}
+    for part in header.split(","):
+        match = re.match(r"\s*([\w.-]+);dur=([\d.]+)", part)
+        if match:
+            stages[match.group(1)] = float(match.group(2))
+    return stages
+
+
+def parse_counters(text, name):
+    counts = {}
+    for match in re.finditer(rf'^{name}\{{(\w+)="([^"]*)"\}} ([\d.e+]+)$', text, re.MULTILINE):
+        counts[match.group(2)] = float(match.group(3))
+    return counts
+
+
+class Stack:
+    """Stub Ollama plus the app, in subprocesses, torn down on exit."""
+
+    def __init__(self, args):
+        self.args = args
+        self.procs = []
+        self.workdir = None
+
+    def __enter__(self):
+        args = self.args
+        stub_port, app_port = free_port(), free_port()
+        self.workdir = tempfile.mkdtemp(prefix="load_test_")
+        shutil.copy(os.path.join(APP_DIR, "order_management.db"), self.workdir)
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(p for p in (APP_DIR, os.environ.get("PYTHONPATH")) if p),
+            "OLLAMA_URL": f"http://127.0.0.1:{stub_port}",
+            "SERVER_TIMING": "1",
+        }
+        if "ONNX_MODEL_DIR" not in env and os.path.isdir(os.path.join(APP_DIR, "onnx_models")):
+            env["ONNX_MODEL_DIR"] = os.path.join(APP_DIR, "onnx_models", "all-MiniLM-L6-v2")
+        quiet = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL} if not args.verbose else {}
+        self.procs.append(subprocess.Popen(
+            [sys.executable, os.path.join(APP_DIR, "stub_ollama.py"), "--port", str(stub_port),
+             "--latency", str(args.latency), "--token-delay", str(args.token_delay)],
+            env=env, **quiet,
+        ))
+        if args.workers > 1:
+            server = [sys.executable, os.path.join(APP_DIR, "serve.py"), "--workers", str(args.workers)]
+        else:
+            server = [sys.executable, "-m", "uvicorn", "app:app", "--log-level", "warning"]
+        self.procs.append(subprocess.Popen(server + ["--port", str(app_port)], cwd=self.workdir, env=env, **quiet))
+        self.url = f"http://127.0.0.1:{app_port}"
+        self._wait_ready()
+        return self
+
+    def _wait_ready(self, timeout=300):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if any(p.poll() is not None for p in self.procs):
+                raise RuntimeError("stub or app exited during startup (rerun with --verbose)")
+            try:
+                if httpx.get(f"{self.url}/ready", timeout=2).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.3)
+        raise RuntimeError(f"app not ready after {timeout}s")
+
+    def __exit__(self, *exc):
+        for proc in reversed(self.procs):
+            proc.send_signal(signal.SIGTERM)
+        for proc in self.procs:
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+async def replay(url, queries, args):
+    samples = []  # (latency seconds, status, stages)
+    counter = iter(range(10**9))
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    async def client(http):
+        while True:
+            i = next(counter)
+            if deadline is None and i >= args.requests:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            body = {"session_id": f"load-{i % args.sessions}", "prompt": queries[i % len(queries)]}
+            start = time.perf_counter()
+            try:
+                response = await http.post("/chat", json=body)
+                status = response.status_code
+                stages = parse_server_timing(response.headers.get("server-timing", ""))
+            except httpx.HTTPError as e:
+                status, stages = type(e).__name__, {}
+            samples.append((time.perf_counter() - start, status, stages))
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+
+def summarize(samples, elapsed):
+    ok = sorted(latency for latency, status, _ in samples if status == 200)
+    errors = {}
+    for _, status, _ in samples:
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    stage_values = {}
+    for _, status, stages in samples:
+        for stage, ms in stages.items():
+            stage_values.setdefault(stage, []).append(ms)
+    stages = {}
+    for stage, values in stage_values.items():
+        values.sort()
+        stages[stage] = {
+            "count": len(values),
+            "mean_ms": round(sum(values) / len(values), 3),
+            "p50_ms": percentile(values, 0.50),
+            "p95_ms": percentile(values, 0.95),
+        }
+    ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+    return {
+        "requests": len(samples),
+        "ok": len(ok),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": ms(sum(ok) / len(ok)) if ok else None,
+            "p50": ms(percentile(ok, 0.50)),
+            "p95": ms(percentile(ok, 0.95)),
+            "p99": ms(percentile(ok, 0.99)),
+            "max": ms(ok[-1]) if ok else None,
+        },
+        "stages": dict(sorted(stages.items(), key=lambda kv: -kv[1]["mean_ms"] * kv[1]["count"])),
+    }
+
+
+def print_report(result, previous=None):
+    s = result["summary"]
+    lat = s["latency_ms"]
+    print(f"{s['ok']}/{s['requests']} ok in {s['elapsed_s']}s: {s['rps']} req/s, "
+          f"p50 {lat['p50']} ms, p95 {lat['p95']} ms, p99 {lat['p99']} ms")
+    if s["errors"]:
+        print("errors:", s["errors"])
+    print(f"\n{'stage':<32} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for stage, st in s["stages"].items():
+        print(f"{stage:<32} {st['count']:>6} {st['mean_ms']:>9.2f} {st['p50_ms']:>9.2f} {st['p95_ms']:>9.2f}")
+    if result.get("answer_sources"):
+        print("\nanswer sources:", ", ".join(f"{k}={int(v)}" for k, v in result["answer_sources"].items()))
+    if previous:
+        p = previous["summary"]
+        print(f"\nvs {previous.get('commit')} ({previous.get('started_at')}):")
+        for label, new, old in (("req/s", s["rps"], p["rps"]),
+                                *((f"{q} ms", lat[q], p["latency_ms"].get(q)) for q in ("p50", "p95", "p99"))):
+            if new is not None and old:
+                print(f"  {label:<8} {old:>10} -> {new:>10} ({(new - old) / old:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load an already running app instead of starting one")
+    parser.add_argument("--corpus", default=os.path.join(APP_DIR, "chat_log.txt"))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="run for this many seconds instead")
+    parser.add_argument("--warmup", type=int, default=20, help="requests sent before measuring")
+    parser.add_argument("--sessions", type=int, default=50, help="distinct session ids to spread requests over")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per LLM call")
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1, help=">1 runs serve.py with that many workers")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="result JSON path")
+    parser.add_argument("--compare", help="earlier result JSON to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show stub and app output")
+    args = parser.parse_args()
+
+    queries = load_corpus(args.corpus)
+    started_at = datetime.datetime.now().isoformat(timespec="seconds")
+
+    def run(url):
+        if args.warmup:
+            warm = argparse.Namespace(**{**vars(args), "requests": args.warmup, "duration": None})
+            asyncio.run(replay(url, queries, warm))
+        before = httpx.get(f"{url}/metrics", timeout=10).text
+        samples, elapsed = asyncio.run(replay(url, queries, args))
+        after = httpx.get(f"{url}/metrics", timeout=10).text
+        old = parse_counters(before, "chatbot_answers_total")
+        sources = {k: v - old.get(k, 0) for k, v in parse_counters(after, "chatbot_answers_total").items()}
+        return summarize(samples, elapsed), {k: v for k, v in sorted(sources.items()) if v}
+
+    if args.url:
+        summary, sources = run(args.url.rstrip("/"))
+    else:
+        with Stack(args) as stack:
+            summary, sources = run(stack.url)
+
+    result = {
+        "commit": git_commit(),
+        "started_at": started_at,
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "verbose")},
+        "summary": summary,
+        "answer_sources": sources,
+    }
+    out = args.out or os.path.join(
+        APP_DIR, "benchmarks", "results", f"load_test-{result['commit']}-{started_at.replace(':', '')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_report(result, previous)
+    print(f"\nwrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import base64
+import csv
+import io
+import json
+import zlib
+
+FORMATS = {
+    "txt": ("text/plain", "txt"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "csv": ("text/csv", "csv"),
+}
+
+INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_chat_log_session_ts ON chat_log (session_id, timestamp)"
+
+# (session_id, timestamp) index entries end with the rowid, so this keyset scan
+# walks the index in order and never re-reads earlier pages
+PAGE_SQL = """
+    SELECT id, timestamp, user_query, bot_response FROM chat_log
+    WHERE session_id = ? AND (timestamp, id) > (?, ?)
+    ORDER BY timestamp, id
+    LIMIT ?
+"""
+
+
+def encode_cursor(timestamp, row_id):
+    return base64.urlsafe_b64encode(json.dumps([timestamp, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Position after which the next page starts; None means from the beginning."""
+    if not cursor:
+        return "", 0
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor")
+
+
+def format_txt(timestamp, user_query, bot_response):
+    return f"[{timestamp}] USER: {user_query}\nBOT: {bot_response}\n"
+
+
+def fetch_page(db, session_id, cursor=None, limit=100):
+    """Return (rows, next_cursor); next_cursor is None on the last page."""
+    after_ts, after_id = decode_cursor(cursor)
+    _, rows = db.query(PAGE_SQL, (session_id, after_ts, after_id, limit + 1))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    return rows, next_cursor
+
+
+def _render(rows, fmt):
+    if fmt == "jsonl":
+        return "".join(
+            json.dumps({"timestamp": ts, "user_query": uq, "bot_response": br}, ensure_ascii=False) + "\n"
+            for _, ts, uq, br in rows
+        )
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerows((ts, uq, br) for _, ts, uq, br in rows)
+        return buf.getvalue()
+    return "\n".join(format_txt(ts, uq, br) for _, ts, uq, br in rows) + "\n"
+
+
+def stream_session(db, session_id, fmt="txt", compress=False, batch_size=500):
+    """Yield the session transcript in bytes chunks straight from a cursor, in constant memory.
+
+    Uses its own connection: a streaming response is iterated from worker threads and must
+    not share the per-thread request connection.
+    """
+    conn = db.connect()
+    try:
+        cursor = conn.execute(
+            "SELECT id, timestamp, user_query, bot_response FROM chat_log WHERE session_id = ? ORDER BY timestamp, id",
+            (session_id,)
+        )
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: gzip container
+        if fmt == "csv":
+            header = "timestamp,user_query,bot_response\r\n".encode("utf-8")
+            yield compressor.compress(header) if compressor else header
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            chunk = _render(rows, fmt).encode("utf-8")
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor:
+            yield compressor.flush()
+    finally:
+        conn.close()
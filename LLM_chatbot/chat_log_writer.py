@@ -0,0 +1,162 @@
+import queue
+import threading
+import time
+from collections import Counter
+
+INSERT_SQL = "INSERT INTO chat_log (session_id, timestamp, user_query, bot_response) VALUES (?, ?, ?, ?)"
+
+# What submit() does when the queue is full
+DROP_NEWEST = "drop_newest"   # discard the incoming row
+DROP_OLDEST = "drop_oldest"   # discard the oldest queued row to make room
+BLOCK = "block"               # wait up to block_timeout, then discard the incoming row
+POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+
+class _FlushMarker:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class ChatLogWriter:
+    """Background writer that batches chat_log inserts off the request path.
+
+    Rows are queued by submit() and written by one thread with executemany in a single
+    transaction, whenever batch_size rows are waiting or flush_interval seconds have
+    passed. The queue is bounded; the overflow policy decides what gets dropped, and
+    every outcome is counted in stats().
+    """
+
+    def __init__(self, db, batch_size=200, flush_interval=0.5, max_queue=10000,
+                 policy=DROP_OLDEST, block_timeout=0.05, max_retries=3):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.counters = Counter()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, session_id, timestamp, user_query, bot_response):
+        """Queue one row; returns False if it was dropped."""
+        if self._thread is None:
+            self.start()
+        row = (session_id, timestamp, user_query, bot_response)
+        try:
+            if self.policy == BLOCK:
+                self.queue.put(row, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(row)
+        except queue.Full:
+            if self.policy != DROP_OLDEST:
+                self.counters["dropped_newest"] += 1
+                return False
+            try:
+                oldest = self.queue.get_nowait()
+                if isinstance(oldest, _FlushMarker):
+                    oldest.done.set()
+                else:
+                    self.counters["dropped_oldest"] += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(row)
+            except queue.Full:
+                self.counters["dropped_newest"] += 1
+                return False
+        self.counters["enqueued"] += 1
+        return True
+
+    def flush(self, timeout=2.0):
+        """Wait until everything queued before this call is written (read-your-writes)."""
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        marker = _FlushMarker()
+        try:
+            self.queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def stop(self, timeout=5.0):
+        """Stop accepting work, drain the queue and join the writer thread."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._drain_remaining()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch, markers = self._collect()
+            self._write(batch)
+            for marker in markers:
+                marker.done.set()
+        self._drain_remaining()
+
+    def _collect(self):
+        batch, markers = [], []
+        try:
+            item = self.queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return batch, markers
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if isinstance(item, _FlushMarker):
+                markers.append(item)
+                break
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        return batch, markers
+
+    def _drain_remaining(self):
+        batch = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _FlushMarker):
+                item.done.set()
+            else:
+                batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        self._write(batch)
+
+    def _write(self, batch):
+        if not batch:
+            return
+        for attempt in range(self.max_retries):
+            try:
+                with self.db.transaction() as conn:
+                    conn.executemany(INSERT_SQL, batch)
+                self.counters["written"] += len(batch)
+                self.counters["batches"] += 1
+                return
+            except Exception as e:
+                self.counters["write_errors"] += 1
+                print("Chat log write failed:", e)
+                time.sleep(0.05 * (attempt + 1))
+        self.counters["dropped_on_error"] += len(batch)
+
+    def stats(self):
+        return {**self.counters, "queue_depth": self.queue.qsize(), "policy": self.policy}
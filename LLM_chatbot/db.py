@@ -0,0 +1,96 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Applied to every new connection. WAL lets readers run alongside the single writer,
+# NORMAL sync is durable across application crashes, and the larger page cache plus
+# mmap keep hot tables out of read() syscalls.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+class Database:
+    """Shared SQLite access: one long-lived connection per thread, reused across requests.
+
+    Keeping the connection open means the pragmas are applied once and sqlite3's
+    per-connection statement cache (`cached_statements`) is reused by every request
+    served on that thread, instead of re-preparing each statement on a fresh connection.
+    Connections run in autocommit mode; use `transaction()` to group writes.
+    """
+
+    def __init__(self, path, busy_timeout_ms=5000, cached_statements=256):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Open a new, configured connection (not tracked per thread)."""
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def query(self, sql, params=()):
+        """Return (column names, rows)."""
+        cursor = self.connection().execute(sql, params)
+        cols = [desc[0] for desc in cursor.description] if cursor.description else []
+        return cols, cursor.fetchall()
+
+    def query_dicts(self, sql, params=()):
+        cols, rows = self.query(sql, params)
+        return [dict(zip(cols, row)) for row in rows]
+
+    def query_one(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchone()
+
+    def execute(self, sql, params=()):
+        return self.connection().execute(sql, params)
+
+    def executescript(self, script):
+        return self.connection().executescript(script)
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT on this thread's connection, rolled back on error."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+
+TORCH = "torch"
+ONNX = "onnx"
+ONNX_INT8 = "onnx-int8"
+BACKENDS = (TORCH, ONNX, ONNX_INT8)
+
+# Files written by export_onnx.py
+ONNX_FILES = {ONNX: "model.onnx", ONNX_INT8: "model_int8.onnx"}
+
+
+class OnnxEmbedder:
+    """SentenceTransformer-compatible `encode()` running the transformer on ONNX Runtime.
+
+    Reproduces the all-MiniLM-L6-v2 pipeline (tokenize, transformer, mean pooling over
+    the attention mask, L2 normalization) with only onnxruntime, tokenizers and numpy
+    loaded, so neither torch nor transformers is imported at serving time.
+    """
+
+    def __init__(self, model_dir, file_name="model.onnx", max_length=256, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, file_name), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, **kwargs):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        chunks = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        embeddings = np.concatenate(chunks).astype(np.float32, copy=False)
+        return embeddings[0] if single else embeddings
+
+
+def load_embedding_model(backend, model_name, onnx_dir=None, threads=None):
+    """Return an object with SentenceTransformer's encode() for the requested backend."""
+    if backend == TORCH:
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name)
+    if backend in ONNX_FILES:
+        model_dir = onnx_dir or os.path.join("onnx_models", model_name)
+        if not os.path.exists(os.path.join(model_dir, ONNX_FILES[backend])):
+            raise FileNotFoundError(
+                f"{model_dir}/{ONNX_FILES[backend]} not found; run python export_onnx.py --model {model_name}"
+            )
+        return OnnxEmbedder(model_dir, ONNX_FILES[backend], threads=threads)
+    raise ValueError(f"embedding backend must be one of {BACKENDS}, got {backend!r}")
+
+
+def model_key(backend, model_name):
+    """Name the FAQ embedding store hashes with; other backends' vectors differ slightly."""
+    return model_name if backend == TORCH else f"{model_name}+{backend}"
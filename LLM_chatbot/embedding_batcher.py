@@ -0,0 +1,98 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+
+class EmbeddingBatcher:
+    """Coalesces single-text encode requests from concurrent callers into batched encode calls.
+
+    A worker thread takes the first waiting text, keeps collecting for up to max_wait_ms
+    or until max_batch_size texts are queued, then encodes them with one encode_batch call
+    and hands each caller its row. max_wait_ms trades a little latency at low load for
+    larger batches under load; with 0 it only batches what is already queued.
+    """
+
+    def __init__(self, encode_batch, max_batch_size=32, max_wait_ms=2.0):
+        self.encode_batch = encode_batch  # list of texts -> 2-D array, one row per text
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.counters = Counter()
+        self.max_batch_seen = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, text):
+        """Queue text; the returned Future resolves to its embedding."""
+        if self._thread is None:
+            self.start()
+        future = Future()
+        self.queue.put((text, future))
+        return future
+
+    def encode(self, text):
+        """Blocking single-text encode through the batcher."""
+        return self.submit(text).result()
+
+    async def encode_async(self, text):
+        """Encode without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect(self):
+        item = self.queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                self.queue.put(None)  # finish this batch, stop on the next round
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while (batch := self._collect()) is not None:
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                embeddings = self.encode_batch([text for text, _ in batch])
+            except Exception as e:
+                self.counters["errors"] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+            self.counters["batches"] += 1
+            self.counters["items"] += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+    def stats(self):
+        batches = self.counters["batches"]
+        return {
+            **self.counters,
+            "mean_batch_size": round(self.counters["items"] / batches, 2) if batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "queue_depth": self.queue.qsize(),
+        }
@@ -0,0 +1,83 @@
+"""Export the embedding model to ONNX and an int8 dynamically quantized copy.
+
+One-off, needs torch, transformers, onnx and onnxruntime; serving with EMBED_BACKEND=onnx
+or onnx-int8 afterwards needs only onnxruntime and tokenizers:
+
+    python export_onnx.py                                  # -> onnx_models/all-MiniLM-L6-v2/
+    python export_onnx.py --model all-MiniLM-L6-v2 --out onnx_models/all-MiniLM-L6-v2
+"""
+import argparse
+import inspect
+import os
+
+from embedding_backend import ONNX, ONNX_FILES, ONNX_INT8
+
+
+def export(model_name, out_dir, opset=17):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    repo = model_name if "/" in model_name or os.path.isdir(model_name) else f"sentence-transformers/{model_name}"
+    tokenizer = AutoTokenizer.from_pretrained(repo)
+    model = AutoModel.from_pretrained(repo).eval()
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer.save_pretrained(out_dir)  # writes tokenizer.json for the tokenizers library
+
+    sample = tokenizer(["export sample", "a second, longer export sample"], padding=True, return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "sequence"} for n in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    class TokenEmbeddings(torch.nn.Module):
+        # Positional inputs in a fixed order, whatever model.forward's signature is
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(names, inputs))).last_hidden_state
+
+    # torch 2.5+ takes a dynamo flag (and newer releases default it to True); stay on the
+    # TorchScript exporter, which handles dynamic_axes, without breaking older torch
+    extra = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(),
+            tuple(sample[n] for n in names),
+            os.path.join(out_dir, ONNX_FILES[ONNX]),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=opset,
+            **extra,
+        )
+
+
+def quantize(out_dir):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # Dynamic quantization: int8 weights, activations quantized per batch at run time
+    quantize_dynamic(
+        os.path.join(out_dir, ONNX_FILES[ONNX]),
+        os.path.join(out_dir, ONNX_FILES[ONNX_INT8]),
+        weight_type=QuantType.QInt8,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--out", help="output directory (default onnx_models/<model>)")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    out_dir = args.out or os.path.join("onnx_models", os.path.basename(args.model.rstrip("/")))
+    export(args.model, out_dir, args.opset)
+    quantize(out_dir)
+    for name in ONNX_FILES.values():
+        path = os.path.join(out_dir, name)
+        print(f"{path}: {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
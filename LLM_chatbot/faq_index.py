@@ -0,0 +1,99 @@
+import numpy as np
+
+# FAQ sets at least this large get an approximate (IVF) index by default
+IVF_MIN_SIZE = 20000
+
+
+def normalize_rows(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first (partial sort)."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(scores.shape[0])
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class IVFIndex:
+    """Inverted-file index: k-means coarse clusters, exact scoring inside the probed lists."""
+
+    def __init__(self, matrix, n_lists=None, n_probe=8, n_iter=10, seed=0):
+        self.matrix = matrix
+        n = matrix.shape[0]
+        self.n_lists = n_lists or max(1, int(np.sqrt(n)))
+        self.n_probe = min(n_probe, self.n_lists)
+        self.centroids = self._train(n_iter, seed)
+        assignments = np.argmax(matrix @ self.centroids.T, axis=1)
+        self.lists = [np.flatnonzero(assignments == c) for c in range(self.n_lists)]
+
+    def _train(self, n_iter, seed):
+        rng = np.random.default_rng(seed)
+        n = self.matrix.shape[0]
+        sample = self.matrix[rng.choice(n, size=min(n, self.n_lists * 256), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(self.n_lists):
+                members = sample[assignments == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = normalize_rows(centroids)
+        return centroids
+
+    def search(self, query, k):
+        probe = top_k_indices(self.centroids @ query, self.n_probe)
+        candidates = np.concatenate([self.lists[c] for c in probe])
+        if candidates.size == 0:
+            return candidates, np.empty(0, dtype=np.float32)
+        scores = self.matrix[candidates] @ query
+        best = top_k_indices(scores, k)
+        return candidates[best], scores[best]
+
+
+class FaqIndex:
+    """FAQ entries plus one pre-normalized float32 matrix of their embeddings."""
+
+    def __init__(self, entries, embeddings, approximate=None, n_probe=8, normalized=False):
+        self.entries = list(entries)
+        if not self.entries:
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+        elif normalized:
+            # Already unit-length float32 (e.g. a read-only memmap) - keep it zero-copy
+            self.matrix = embeddings
+        else:
+            self.matrix = normalize_rows(embeddings)
+        if approximate is None:
+            approximate = len(self.entries) >= IVF_MIN_SIZE
+        self.ivf = IVFIndex(self.matrix, n_probe=n_probe) if approximate and len(self.entries) else None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, query_embedding, top_k=1, threshold=None):
+        """Return up to top_k (entry, score) pairs ordered by cosine similarity."""
+        if not self.entries:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        if self.ivf is not None:
+            idx, scores = self.ivf.search(query, top_k)
+        else:
+            all_scores = self.matrix @ query
+            idx = top_k_indices(all_scores, top_k)
+            scores = all_scores[idx]
+        return [
+            (self.entries[i], float(s))
+            for i, s in zip(idx, scores)
+            if threshold is None or s >= threshold
+        ]
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from faq_index import FaqIndex, normalize_rows
+from table_versions import get_table_version, track_table_versions
+
+EMBEDDINGS_FILE = "faq_embeddings.npy"
+# Re-reads allowed when the faq table keeps changing while a sync is encoding
+MAX_SYNC_ATTEMPTS = 5
+# Read once at import: os.umask() can only be read by setting it, which is not thread-safe
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# Sidecar table holding one embedding per FAQ row; edits to `faq` are noticed
+# through the trigger-maintained counters in table_versions.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS faq_embedding (
+    faq_id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    embedding BLOB NOT NULL
+);
+"""
+
+
+def init_faq_store(db):
+    db.executescript(SCHEMA)
+    track_table_versions(db, ["faq"])
+
+
+def content_hash(model_name, question, keywords):
+    text = f"{model_name}\x00{question or ''}\x00{keywords or ''}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class FaqEmbeddingStore:
+    """Persists FAQ embeddings keyed by content hash and shares them via an mmapped .npy file.
+
+    `sync()` only encodes rows that are new or whose question/keywords changed, then
+    publishes a normalized float32 matrix next to the database. Every process (one per
+    uvicorn worker) maps that file read-only, so the pages are shared by the OS.
+    """
+
+    def __init__(self, db, model_name, encode, embeddings_file=EMBEDDINGS_FILE, refresh_interval=5.0):
+        self.db = db
+        self.model_name = model_name
+        self.encode = encode
+        self.embeddings_file = embeddings_file
+        self.meta_file = os.path.splitext(embeddings_file)[0] + ".json"
+        self.refresh_interval = refresh_interval
+        self.version = None
+        self.index = None
+        self._last_check = 0.0
+        # get_index() runs on several pipeline threads; one sync at a time per process
+        self._sync_lock = threading.Lock()
+
+    def sync(self):
+        """Encode new/changed FAQ rows, drop removed ones and return a fresh FaqIndex."""
+        with self._sync_lock:
+            return self._sync()
+
+    def _sync(self):
+        init_faq_store(self.db)
+        with self.db.transaction() as conn:
+            removed = conn.execute("DELETE FROM faq_embedding WHERE faq_id NOT IN (SELECT id FROM faq)").rowcount
+        encoded = 0
+        for attempt in range(MAX_SYNC_ATTEMPTS):
+            # Read the version first: if faq changes after this, the next get_index() re-syncs
+            version = get_table_version(self.db, "faq")
+            # One statement, so the rows, their hashes and their embeddings are one snapshot
+            _, snapshot = self.db.query(
+                "SELECT f.id, f.question, f.keywords, f.answer, e.content_hash, e.embedding"
+                " FROM faq f LEFT JOIN faq_embedding e ON e.faq_id = f.id ORDER BY f.id"
+            )
+            hashes = [content_hash(self.model_name, q, k) for _, q, k, _, _, _ in snapshot]
+            stale = [(row, h) for row, h in zip(snapshot, hashes) if row[4] != h]
+            if stale and attempt < MAX_SYNC_ATTEMPTS - 1:
+                # Encode outside the write transaction so chat logging is not blocked meanwhile;
+                # the next pass re-reads the snapshot in case faq changed while encoding
+                vectors = normalize_rows(self.encode([f"{q} {k}".strip() for (_, q, k, *_), _ in stale]))
+                with self.db.transaction() as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO faq_embedding (faq_id, content_hash, embedding) VALUES (?, ?, ?)",
+                        [(row[0], h, vec.tobytes()) for (row, h), vec in zip(stale, vectors)]
+                    )
+                encoded += len(stale)
+                continue
+            # Normally every row; if faq kept changing, the rows whose embedding is current
+            # (and version is cleared below, so the next get_index() picks up the rest)
+            current = [(row, h) for row, h in zip(snapshot, hashes) if row[4] == h]
+            rows = [row[:4] for row, _ in current]
+            stamp = hashlib.sha1("".join(f"{row[0]}:{h};" for row, h in current).encode()).hexdigest()
+            matrix = self._load_shared(stamp, len(rows))
+            if matrix is None:
+                matrix = self._publish(stamp, [np.frombuffer(row[5], dtype=np.float32) for row, _ in current])
+            # One vector per entry, in the same order, or answers would go with the wrong question
+            if matrix.shape[0] == len(rows):
+                break
+        else:
+            raise RuntimeError(f"FAQ embedding matrix did not match the faq table in {MAX_SYNC_ATTEMPTS} attempts")
+        print(f"FAQ embeddings: {len(rows)} rows, {encoded} encoded, {removed} removed")
+
+        entries = [{"id": i, "question": q, "keywords": k, "answer": a} for i, q, k, a in rows]
+        self.version = version if len(rows) == len(snapshot) else None
+        self.index = FaqIndex(entries, matrix, normalized=True)
+        self._last_check = time.monotonic()
+        return self.index
+
+    def _load_shared(self, stamp, n_rows):
+        try:
+            with open(self.meta_file, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("stamp") != stamp:
+                return None
+            matrix = np.load(self.embeddings_file, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        return matrix if matrix.shape[0] == n_rows else None
+
+    def _publish(self, stamp, vectors):
+        matrix = np.ascontiguousarray(np.vstack(vectors), dtype=np.float32) if vectors else np.empty((0, 0), dtype=np.float32)
+        # Write to uniquely named temp files and rename, so concurrent readers never see a
+        # partial matrix and concurrent writers (other workers) never share a temp file
+        tmp_npy = self._temp_file(self.embeddings_file)
+        tmp_meta = self._temp_file(self.meta_file)
+        try:
+            with open(tmp_npy, "wb") as f:
+                np.save(f, matrix)
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                json.dump({"stamp": stamp, "model": self.model_name, "rows": matrix.shape[0]}, f)
+            # Map the file before the rename: another worker may publish over the name right
+            # after, and the mapping has to be of this matrix
+            if matrix.size:
+                matrix = np.load(tmp_npy, mmap_mode="r")
+            os.replace(tmp_npy, self.embeddings_file)
+            os.replace(tmp_meta, self.meta_file)
+        finally:
+            for tmp in (tmp_npy, tmp_meta):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        return matrix
+
+    @staticmethod
+    def _temp_file(path):
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                   dir=os.path.dirname(os.path.abspath(path)))
+        os.close(fd)
+        # mkstemp creates 0600 files; publish with the mode a plain open() would have given
+        os.chmod(tmp, 0o666 & ~UMASK)
+        return tmp
+
+    def get_index(self):
+        """Return the current index, re-syncing if the faq table changed since the last load."""
+        if self.index is None:
+            with self._sync_lock:
+                # Another thread may have loaded it while this one waited
+                return self.index if self.index is not None else self._sync()
+        now = time.monotonic()
+        if now - self._last_check >= self.refresh_interval:
+            self._last_check = now
+            if get_table_version(self.db, "faq") != self.version:
+                with self._sync_lock:
+                    if get_table_version(self.db, "faq") != self.version:
+                        return self._sync()
+        return self.index
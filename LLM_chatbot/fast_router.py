@@ -0,0 +1,158 @@
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+
+from table_versions import get_table_versions, track_table_versions
+
+# A routed query: the table/intent it answers, parameterized SQL and its bound values
+Route = namedtuple("Route", ["name", "intent", "sql", "params"])
+
+ROUTED_TABLES = ("product_info", "order_status", "support_contacts")
+
+ORDER_ID_RE = re.compile(r"\bORD\d+\b", re.IGNORECASE)
+CONTACT_WORDS = {"contact", "phone", "email", "mail", "number", "reach", "call", "details", "team"}
+ORDER_WORDS = {"order", "orders", "ordered", "purchases"}
+
+_END = object()
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class EntityTrie:
+    """Word-level trie over every entity name; one left-to-right pass finds the longest matches."""
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def add(self, phrase, kind, value):
+        node = self.root
+        for token in tokenize(phrase):
+            node = node.setdefault(token, {})
+        if node is not self.root:
+            node.setdefault(_END, []).append((kind, value))
+            self.size += 1
+
+    def find(self, tokens):
+        """Return {kind: [values]} for the longest entity match starting at each token."""
+        found = {}
+        i = 0
+        while i < len(tokens):
+            node, best, best_end = self.root, None, i
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if _END in node:
+                    best, best_end = node[_END], j + 1
+            if best:
+                for kind, value in best:
+                    found.setdefault(kind, []).append(value)
+                i = best_end
+            else:
+                i += 1
+        return found
+
+
+class FastRouter:
+    """Answers recognizable queries (order IDs, product names, departments, customers) without the LLM.
+
+    Entity names are loaded from the database into one EntityTrie and reloaded when the
+    trigger-maintained table versions change.
+    """
+
+    def __init__(self, db, refresh_interval=5.0):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.trie = EntityTrie()
+        self.product_names = []
+        self.versions = None
+        self.hits = Counter()
+        self.misses = 0
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        trie = EntityTrie()
+        product_names = []
+        track_table_versions(self.db, ROUTED_TABLES)
+        versions = get_table_versions(self.db, ROUTED_TABLES)
+        for product_id, name in self.db.query("SELECT product_id, name FROM product_info")[1]:
+            trie.add(name, "product", product_id)
+            product_names.append(name)
+        for (department,) in self.db.query("SELECT department FROM support_contacts")[1]:
+            trie.add(department, "department", department)
+        for (customer,) in self.db.query("SELECT DISTINCT customer_name FROM order_status")[1]:
+            trie.add(customer, "customer", customer)
+            for part in customer.split():
+                trie.add(part, "customer", part)
+        self.trie, self.product_names, self.versions = trie, product_names, versions
+        self._last_check = time.monotonic()
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if self.versions is not None and now - self._last_check < self.refresh_interval:
+            return
+        with self._lock:
+            if self.versions is None:
+                self.load()
+                return
+            self._last_check = now
+            if get_table_versions(self.db, ROUTED_TABLES) != self.versions:
+                self.load()
+
+    def find_entities(self, text):
+        """(kind, value) for each known product, department or customer named in text."""
+        self.maybe_reload()
+        return [(kind, value) for kind, values in self.trie.find(tokenize(text)).items() for value in values]
+
+    def route(self, user_query):
+        """Return a Route for queries the rules can answer directly, else None."""
+        self.maybe_reload()
+        route = self._match(user_query)
+        if route is None:
+            self.misses += 1
+        else:
+            self.hits[route.name] += 1
+        return route
+
+    def _match(self, user_query):
+        order_id = ORDER_ID_RE.search(user_query)
+        if order_id:
+            return Route("order_id", "order_status",
+                         "SELECT * FROM order_status WHERE order_id = ?", (order_id.group().upper(),))
+
+        tokens = tokenize(user_query)
+        words = set(tokens)
+        entities = self.trie.find(tokens)
+
+        customer = entities.get("customer")
+        if customer and words & ORDER_WORDS:
+            return Route("customer_orders", "order_status",
+                         "SELECT order_id, customer_name, status FROM order_status WHERE customer_name LIKE ?",
+                         (f"%{customer[0]}%",))
+
+        products = entities.get("product")
+        if products:
+            placeholders = ", ".join("?" for _ in products)
+            return Route("product", "product_info",
+                         f"SELECT * FROM product_info WHERE product_id IN ({placeholders})", tuple(products))
+
+        departments = entities.get("department")
+        if departments and words & CONTACT_WORDS:
+            return Route("support_contact", "support_contacts",
+                         "SELECT department, phone, email FROM support_contacts WHERE department = ?",
+                         (departments[0],))
+        return None
+
+    def stats(self):
+        total = sum(self.hits.values()) + self.misses
+        return {
+            "entities": self.trie.size,
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": round(sum(self.hits.values()) / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,228 @@
+import bisect
+import contextvars
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond cache hits up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _value(value):
+    """A sample value at full precision (:g would print 1234567 as 1.23457e+06)."""
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1.0):
+        with self._lock:
+            self.values[label_values] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self.values)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *label_values):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self.series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time (queue depths, cache sizes)."""
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self):
+        try:
+            value = float(self.read())
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_value(value)}"]
+
+
+REGISTRY = []
+
+
+def counter(name, help_text, labels=()):
+    metric = Counter(name, help_text, labels)
+    REGISTRY.append(metric)
+    return metric
+
+
+def histogram(name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+    metric = Histogram(name, help_text, labels, buckets)
+    REGISTRY.append(metric)
+    return metric
+
+
+def gauge(name, help_text, read):
+    metric = Gauge(name, help_text, read)
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_prometheus():
+    """All registered metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = histogram("chatbot_stage_seconds", "Time spent per /chat pipeline stage.", ("stage",))
+REQUEST_SECONDS = histogram("chatbot_request_seconds", "End-to-end /chat pipeline time.", ("endpoint",))
+REQUESTS = counter("chatbot_requests_total", "Chat requests by endpoint and outcome.", ("endpoint", "outcome"))
+ANSWERS = counter("chatbot_answers_total", "Replies by the pipeline step that produced them.", ("source",))
+LLM_CALLS = counter("chatbot_llm_calls_total", "LLM generations by call site.", ("call",))
+SQL_ERRORS = counter("chatbot_sql_errors_total", "SQL statements that raised, by target table.", ("table",))
+FALLBACKS = counter("chatbot_fallback_searches_total", "Fallback searches run after an SQL error.", ("table",))
+REJECTIONS = counter("chatbot_rejections_total", "Requests refused by admission control.", ("stage", "reason"))
+
+
+class Trace:
+    """Spans of one request, in the order they finished."""
+
+    __slots__ = ("endpoint", "started", "spans", "attributes")
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.spans = []
+        self.attributes = {}
+
+    def timings_ms(self):
+        totals = {}
+        for stage, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds * 1000
+        totals["total"] = (time.perf_counter() - self.started) * 1000
+        return {stage: round(ms, 2) for stage, ms in totals.items()}
+
+    def server_timing(self):
+        """Server-Timing header value, e.g. `embed;dur=3.1, llm;dur=812.4, total;dur=820.0`."""
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.timings_ms().items())
+
+
+_current = contextvars.ContextVar("chatbot_trace", default=None)
+
+
+class Tracer:
+    """Starts a Trace per request and writes a sampled fraction of them as JSON lines."""
+
+    def __init__(self, sample_rate=0.0, log_file="traces.jsonl"):
+        self.sample_rate = sample_rate
+        self.log_file = log_file
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, endpoint):
+        trace = Trace(endpoint)
+        token = _current.set(trace)
+        outcome = "error"
+        try:
+            yield trace
+            outcome = "ok"
+        finally:
+            _current.reset(token)
+            REQUEST_SECONDS.observe(time.perf_counter() - trace.started, endpoint)
+            REQUESTS.inc(endpoint, outcome)
+            if self.sample_rate and random.random() < self.sample_rate:
+                self._write(trace, outcome)
+
+    def _write(self, trace, outcome):
+        record = {
+            "ts": time.time(), "endpoint": trace.endpoint, "outcome": outcome,
+            "timings_ms": trace.timings_ms(), **trace.attributes,
+        }
+        line = json.dumps(record) + "\n"
+        try:
+            with self._lock, open(self.log_file, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print("Trace log write failed:", e)
+
+
+@contextmanager
+def span(stage):
+    """Time a pipeline stage into chatbot_stage_seconds and the current request's trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage)
+        trace = _current.get()
+        if trace is not None:
+            trace.spans.append((stage, elapsed))
+
+
+def timed(stage, fn, *args, **kwargs):
+    """fn(*args, **kwargs) inside span(stage); keeps call sites usable in expressions."""
+    with span(stage):
+        return fn(*args, **kwargs)
+
+
+def annotate(**attributes):
+    """Attach attributes (e.g. the answer source) to the current trace, if any."""
+    trace = _current.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import os
+
+import httpx
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2")
+
+
+class OllamaClient:
+    """Async client for Ollama's /api/generate with one pooled connection set per process.
+
+    At most `max_concurrency` generations are in flight at once; further calls wait
+    for a slot instead of piling more work onto the local model server.
+    """
+
+    def __init__(self, base_url=OLLAMA_URL, model=OLLAMA_MODEL, max_concurrency=4,
+                 connect_timeout=5.0, read_timeout=120.0, max_keepalive=8):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_keepalive)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def generate(self, prompt):
+        """Return the full completion for prompt."""
+        async with self.semaphore:
+            response = await self.client.post(
+                "/api/generate",
+                json={"model": self.model, "prompt": prompt, "stream": False}
+            )
+            response.raise_for_status()
+            return response.json()["response"]
+
+    async def stream(self, prompt):
+        """Yield completion tokens as Ollama produces them."""
+        async with self.semaphore:
+            async with self.client.stream(
+                "POST", "/api/generate",
+                json={"model": self.model, "prompt": prompt, "stream": True}
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -2,13 +2,21 @@ import sqlite3
 import os
 import re
 
+from db import Database
+from search_index import init_search_index, search_faq
+
 # === DATABASE SETUP ===
 db_filename = "order_management.db"
+db = Database(db_filename)
 
 def init_db():
+    db.close_all()
     if os.path.exists(db_filename):
         os.remove(db_filename)
         print("✅ Old database deleted!")
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_filename + suffix):
+            os.remove(db_filename + suffix)
 
     conn = sqlite3.connect(db_filename)
     cursor = conn.cursor()
@@ -92,21 +100,18 @@ def init_db():
 
     conn.commit()
     conn.close()
+    init_search_index(db)
     print("✅ Sample data inserted!\n")
 
 # === BOT LOGIC FUNCTIONS ===
 
 def fetch_order_status(user_query):
     try:
-        conn = sqlite3.connect(db_filename)
-        cursor = conn.cursor()
         match = re.search(r"\bORD\d+\b", user_query.upper())
         if not match:
             return "⚠️ No valid order ID found!"
         order_id = match.group()
-        cursor.execute("SELECT * FROM order_status WHERE order_id = ?", (order_id,))
-        row = cursor.fetchone()
-        conn.close()
+        row = db.query_one("SELECT * FROM order_status WHERE order_id = ?", (order_id,))
         if row:
             return f"📦 Order {row[0]} for {row[1]} is currently: {row[2]}"
         else:
@@ -116,60 +121,41 @@ def fetch_order_status(user_query):
 
 def fetch_product_price(user_query):
     try:
-        conn = sqlite3.connect(db_filename)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name, price FROM product_info")
-        for name, price in cursor.fetchall():
+        _, rows = db.query("SELECT name, price FROM product_info")
+        for name, price in rows:
             if name.lower() in user_query.lower():
-                conn.close()
                 return f"💰 The price of {name} is ₹{price}"
-        conn.close()
         return "⚠️ No data found."
     except Exception as e:
         return f"❌ Error: {e}"
 
 def fetch_support_contact(user_query):
     try:
-        conn = sqlite3.connect(db_filename)
-        cursor = conn.cursor()
         departments = ["Sales", "Tech Support", "Billing", "Returns", "Warranty", "Accounts"]
         for dept in departments:
             if dept.lower() in user_query.lower():
-                cursor.execute("SELECT phone, email FROM support_contacts WHERE department = ?", (dept,))
-                result = cursor.fetchone()
+                result = db.query_one("SELECT phone, email FROM support_contacts WHERE department = ?", (dept,))
                 if result:
                     phone, email = result
-                    conn.close()
                     return f"📞 {dept} Team\nPhone: {phone}\nEmail: {email}"
-        conn.close()
         return "❓ No matching support department found."
     except sqlite3.Error as e:
         return f"❌ SQL execution failed: {e}"
 
 def fetch_faq_answer(user_query):
     try:
-        conn = sqlite3.connect(db_filename)
-        cursor = conn.cursor()
-        cursor.execute("SELECT question, answer FROM faq")
-        for question, answer in cursor.fetchall():
-            if any(word in user_query.lower() for word in question.lower().split()):
-                conn.close()
-                return f"❓ {question}\n💡 {answer}"
-        conn.close()
+        for question, answer in search_faq(db, user_query, limit=1):
+            return f"❓ {question}\n💡 {answer}"
         return "❓ Sorry, I couldn't find a related FAQ."
     except Exception as e:
         return f"❌ FAQ error: {e}"
 
 def fetch_orders_by_customer(user_query):
     try:
-        conn = sqlite3.connect(db_filename)
-        cursor = conn.cursor()
         name_match = re.search(r"(for|by)\s+([a-zA-Z]+)", user_query)
         if name_match:
             customer_name = name_match.group(2)
-            cursor.execute("SELECT order_id, status FROM order_status WHERE customer_name LIKE ?", (f"%{customer_name}%",))
-            orders = cursor.fetchall()
-            conn.close()
+            _, orders = db.query("SELECT order_id, status FROM order_status WHERE customer_name LIKE ?", (f"%{customer_name}%",))
             if orders:
                 return "\n".join([f"📦 Order {oid} - {status}" for oid, status in orders])
             else:
@@ -181,10 +167,7 @@ def fetch_orders_by_customer(user_query):
 
 def simulate_sql_error():
     try:
-        conn = sqlite3.connect(db_filename)
-        cursor = conn.cursor()
-        cursor.execute("SELECT category FROM support_contacts")  # Invalid column
-        return cursor.fetchall()
+        return db.query("SELECT category FROM support_contacts")[1]  # Invalid column
     except Exception as e:
         return f"❌ Internal error occurred."
 
@@ -0,0 +1,190 @@
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from table_versions import get_table_versions, track_table_versions
+
+CACHED_TABLES = ("faq", "order_status", "product_info", "support_contacts")
+# 'quoted' or "quoted" text, but not the apostrophe in what's or customers'
+QUOTED_RE = re.compile(r"""(?<!\w)['"‘“]([^'"’”]+)['"’”](?!\w)""")
+
+
+def normalize_query(text):
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def literal_key(text, entities=()):
+    """Tokens naming something specific: ones carrying digits (order IDs, model numbers,
+    prices), quoted strings, capitalized words after the start of a sentence (names) and
+    `entities`. Similar-looking queries must agree on these, or "status of ORD1234" would
+    be served the answer for ORD5678 and "orders for Alice" the one for Bob."""
+    literals = {t for t in normalize_query(text).split() if any(c.isdigit() for c in t)}
+    literals.update(normalize_query(quoted) for quoted in QUOTED_RE.findall(text))
+    for sentence in re.split(r"[.!?]+", text):
+        words = re.findall(r"[A-Za-z][A-Za-z0-9]*", sentence)
+        literals.update(w.lower() for w in words[1:] if w[0].isupper() and w != "I")
+    literals.update(f"{kind}:{value}".lower() for kind, value in entities)
+    return tuple(sorted(literals))
+
+
+class CacheEntry:
+    __slots__ = ("key", "reply", "literals", "tables", "versions", "expires", "slot", "size")
+
+    def __init__(self, key, reply, literals, tables, versions, expires, slot, size):
+        self.key = key
+        self.reply = reply
+        self.literals = literals
+        self.tables = tables
+        self.versions = versions
+        self.expires = expires
+        self.slot = slot
+        self.size = size
+
+
+class ResponseCache:
+    """LRU + TTL cache of /chat replies with exact and embedding-similarity lookups.
+
+    Embeddings live in one preallocated float32 matrix (one row per slot) so a semantic
+    lookup is a single matrix-vector product. Every entry remembers the versions of the
+    tables its reply was built from and is dropped as soon as any of them changes.
+    """
+
+    def __init__(self, db, max_entries=2048, max_bytes=16 * 1024 * 1024, ttl=600.0, similarity=0.95,
+                 entity_source=None):
+        self.db = db
+        self.entity_source = entity_source  # anything with find_entities(text), e.g. FastRouter
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.similarity = similarity
+        self.matrix = None  # allocated on the first embedding, once its dimension is known
+        self.slot_used = np.zeros(max_entries, dtype=bool)
+        self.slot_entries = [None] * max_entries
+        self.free_slots = list(range(max_entries - 1, -1, -1))
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        self._tracking = False
+
+    def _versions(self, tables):
+        if not tables:
+            return ()
+        if not self._tracking:
+            track_table_versions(self.db, CACHED_TABLES)
+            self._tracking = True
+        return get_table_versions(self.db, tables)
+
+    def literals(self, query):
+        entities = self.entity_source.find_entities(query) if self.entity_source is not None else ()
+        return literal_key(query, entities)
+
+    def snapshot(self):
+        """Current table versions; take this before computing a reply and pass it to put()."""
+        with self._lock:
+            return dict(zip(CACHED_TABLES, self._versions(CACHED_TABLES)))
+
+    def _is_fresh(self, entry, now):
+        return entry.expires > now and self._versions(entry.tables) == entry.versions
+
+    def _remove(self, entry, reason):
+        del self.entries[entry.key]
+        self.bytes -= entry.size
+        if entry.slot is not None:
+            self.slot_used[entry.slot] = False
+            self.slot_entries[entry.slot] = None
+            self.free_slots.append(entry.slot)
+        self.counters[reason] += 1
+
+    def get(self, query):
+        """Exact lookup on the normalized query text."""
+        with self._lock:
+            entry = self.entries.get(normalize_query(query))
+            if entry is None:
+                return None
+            if not self._is_fresh(entry, time.monotonic()):
+                self._remove(entry, "invalidations")
+                return None
+            self.entries.move_to_end(entry.key)
+            self.counters["exact_hits"] += 1
+            return entry.reply
+
+    def get_similar(self, query, embedding):
+        """Nearest cached query by cosine similarity, if above the threshold and with the same literals."""
+        literals = self.literals(query)
+        with self._lock:
+            if self.matrix is None or not self.entries:
+                self.counters["misses"] += 1
+                return None
+            vec = self._unit(embedding)
+            scores = self.matrix @ vec
+            scores[~self.slot_used] = -1.0
+            now = time.monotonic()
+            for slot in np.argsort(-scores)[:4]:
+                if scores[slot] < self.similarity:
+                    break
+                entry = self.slot_entries[slot]
+                if entry.literals != literals:
+                    continue
+                if not self._is_fresh(entry, now):
+                    self._remove(entry, "invalidations")
+                    continue
+                self.entries.move_to_end(entry.key)
+                self.counters["semantic_hits"] += 1
+                return entry.reply
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, query, reply, tables, embedding=None, snapshot=None):
+        """Cache reply for query. tables are the tables it was read from; with a snapshot from
+        before the reply was computed, a write racing the computation invalidates the entry."""
+        key = normalize_query(query)
+        literals = self.literals(query)
+        size = len(key) + len(reply.encode("utf-8")) + 200
+        with self._lock:
+            if key in self.entries:
+                self._remove(self.entries[key], "replaced")
+            while self.entries and (len(self.entries) >= self.max_entries or self.bytes + size > self.max_bytes):
+                self._remove(next(iter(self.entries.values())), "evictions")
+            if size > self.max_bytes:
+                return
+            slot = None
+            if embedding is not None:
+                vec = self._unit(embedding)
+                if self.matrix is None:
+                    self.matrix = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+                slot = self.free_slots.pop()
+                self.matrix[slot] = vec
+                self.slot_used[slot] = True
+            tables = tuple(tables)
+            versions = tuple(snapshot.get(t, 0) for t in tables) if snapshot else self._versions(tables)
+            entry = CacheEntry(key, reply, literals, tables, versions,
+                               time.monotonic() + self.ttl, slot, size)
+            if slot is not None:
+                self.slot_entries[slot] = entry
+            self.entries[key] = entry
+            self.bytes += size
+
+    @staticmethod
+    def _unit(embedding):
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def clear(self):
+        with self._lock:
+            for entry in list(self.entries.values()):
+                self._remove(entry, "cleared")
+
+    def stats(self):
+        hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,94 @@
+import re
+
+# FTS5 indexes over the text columns of product_info and faq. They are external-content
+# tables (the text is stored once, in the base table) kept in sync by triggers, so
+# keyword lookups are BM25-ranked index probes instead of full-table scans.
+FTS_TABLES = {
+    "product_info_fts": ("product_info", "rowid", ("name", "features")),
+    "faq_fts": ("faq", "id", ("question", "keywords", "answer")),
+}
+
+# Column weights for bm25(), in column order: a hit in a product name or FAQ keyword
+# counts for more than one in the longer descriptive text
+BM25_WEIGHTS = {
+    "product_info_fts": (4.0, 1.0),
+    "faq_fts": (2.0, 3.0, 1.0),
+}
+
+FTS_TEMPLATE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+    {columns}, content='{table}', content_rowid='{rowid}', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS {fts}_ins AFTER INSERT ON {table} BEGIN
+    INSERT INTO {fts} (rowid, {columns}) VALUES (new.{rowid}, {new_columns});
+END;
+CREATE TRIGGER IF NOT EXISTS {fts}_del AFTER DELETE ON {table} BEGIN
+    INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.{rowid}, {old_columns});
+END;
+CREATE TRIGGER IF NOT EXISTS {fts}_upd AFTER UPDATE ON {table} BEGIN
+    INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.{rowid}, {old_columns});
+    INSERT INTO {fts} (rowid, {columns}) VALUES (new.{rowid}, {new_columns});
+END;
+"""
+
+# Words that carry no signal in a question or in the failed SQL handed to the fallback
+STOPWORDS = frozenset("""
+a an and any are as at be by can do does for from have how i in is it me my of on or
+please show tell that the this to what when where which who why with you your
+select like limit group having join distinct lower upper null not
+product_info faq name features price question keywords answer
+""".split())
+
+MAX_TERMS = 16
+
+
+def init_search_index(conn):
+    """Create the FTS tables and triggers; populate a table the first time it is created."""
+    for fts, (table, rowid, columns) in FTS_TABLES.items():
+        existed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (fts,)).fetchone()
+        conn.executescript(FTS_TEMPLATE.format(
+            fts=fts, table=table, rowid=rowid,
+            columns=", ".join(columns),
+            new_columns=", ".join(f"new.{c}" for c in columns),
+            old_columns=", ".join(f"old.{c}" for c in columns),
+        ))
+        if not existed:
+            conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def match_expression(text):
+    """FTS5 MATCH string: any of the text's informative words, each quoted so user input
+    can never be parsed as FTS syntax. None if nothing is left to search for."""
+    terms = []
+    for word in re.findall(r"\w+", text.lower()):
+        if word not in STOPWORDS and word not in terms and (len(word) > 1 or word.isdigit()):
+            terms.append(word)
+    if not terms:
+        return None
+    return " OR ".join(f'"{t}"' for t in terms[:MAX_TERMS])
+
+
+def _search(conn, fts, select, text, limit):
+    expression = match_expression(text)
+    if expression is None:
+        return [], []
+    table, rowid, _ = FTS_TABLES[fts]
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS[fts])
+    cursor = conn.execute(f"""
+        SELECT {select} FROM {fts} JOIN {table} t ON t.{rowid} = {fts}.rowid
+        WHERE {fts} MATCH ?
+        ORDER BY bm25({fts}, {weights})
+        LIMIT ?
+    """, (expression, limit))
+    return [d[0] for d in cursor.description], cursor.fetchall()
+
+
+def search_products(conn, text, limit=10):
+    """product_info rows (as dicts) best matching the words in text."""
+    cols, rows = _search(conn, "product_info_fts", "t.*", text, limit)
+    return [dict(zip(cols, row)) for row in rows]
+
+
+def search_faq(conn, text, limit=1):
+    """(question, answer) pairs best matching the words in text."""
+    return _search(conn, "faq_fts", "t.question, t.answer", text, limit)[1]
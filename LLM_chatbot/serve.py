@@ -0,0 +1,121 @@
+"""Pre-fork launcher: warm up once, then fork N uvicorn workers sharing the model and FAQ index.
+
+    python serve.py --workers 4 --port 8000
+
+The parent imports app.py and runs warm_up() (embedding model, FAQ embeddings, router)
+before forking, so every worker starts ready and shares those pages copy-on-write; the
+FAQ matrix is an mmapped .npy file and is shared through the page cache. Workers accept
+from one listening socket inherited from the parent. A worker that dies is restarted.
+POSIX only (os.fork).
+
+Per-process state stays per process: the response and SQL plan caches are per worker,
+and conversation memory defaults to the SQLite session store so every worker sees it.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app_module, sock, args):
+    import uvicorn
+
+    # Default handlers back, uvicorn installs its own for graceful shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(app_module.app, log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads-per-worker", type=int, default=1,
+                        help="intra-op threads for the embedding model in each worker")
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument("--keep-alive", type=int, default=5)
+    args = parser.parse_args()
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork; on this platform run uvicorn app:app --workers N instead")
+
+    # Must be set before torch/onnxruntime load: thread pools started in the parent do not
+    # survive fork, and one small pool per worker is what N workers on N cores want anyway
+    threads = str(args.threads_per_worker)
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "EMBED_THREADS"):
+        os.environ.setdefault(var, threads)
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    os.environ["CHATBOT_STARTUP_MODE"] = "lazy"  # warm up here, explicitly, before forking
+    if args.workers > 1:
+        os.environ.setdefault("SESSION_STORE", "sqlite")
+
+    import app
+    started = time.perf_counter()
+    app.warm_up()
+    print(f"Warmed up in {time.perf_counter() - started:.1f}s; forking {args.workers} workers")
+    # SQLite connections must not cross a fork; each worker opens its own
+    app.sql_guard.close_all()
+    app.db.close_all()
+    sock = bind_socket(args.host, args.port)
+    # Move everything allocated so far out of the collector's reach, so GC passes in the
+    # workers don't write to (and un-share) the parent's pages
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, sock, args)
+            finally:
+                os._exit(0)
+        children[pid] = slot
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for slot in range(args.workers):
+        spawn(slot)
+    print(f"Serving on http://{args.host}:{args.port} with workers {sorted(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"Worker {pid} exited with status {status}; restarting")
+            time.sleep(0.5)
+            spawn(slot)
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
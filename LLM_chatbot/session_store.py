@@ -0,0 +1,285 @@
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+MEMORY = "memory"
+SQLITE = "sqlite"
+BACKENDS = (MEMORY, SQLITE)
+
+
+def turn_size(user_query, bot_response):
+    return len(user_query.encode("utf-8")) + len(bot_response.encode("utf-8"))
+
+
+def _one_line(text, max_chars):
+    # Newlines are folded so a stored reply can never start a fake "User:" line in a prompt
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+
+
+def render_window(turns, earlier=0, max_chars=1500, max_turn_chars=300):
+    """Compact prompt context for the most recent turns, oldest first, within max_chars.
+
+    Turns that do not fit are counted in a one-line summary instead of being sent.
+    """
+    lines = []
+    used = 0
+    for user_query, bot_response in reversed(turns):
+        block = f"User: {_one_line(user_query, max_turn_chars)}\nBot: {_one_line(bot_response, max_turn_chars)}"
+        if lines and used + len(block) > max_chars:
+            break
+        lines.append(block)
+        used += len(block) + 1
+    earlier += len(turns) - len(lines)
+    if not lines:
+        return ""
+    header = "Conversation so far"
+    if earlier:
+        header += f" ({earlier} earlier turn{'s' if earlier != 1 else ''} omitted)"
+    return header + ":\n" + "\n".join(reversed(lines)) + "\n"
+
+
+class _Session:
+    __slots__ = ("turns", "bytes", "total", "last_seen")
+
+    def __init__(self, max_turns):
+        self.turns = deque(maxlen=max_turns)
+        self.bytes = 0
+        self.total = 0
+        self.last_seen = 0.0
+
+
+class MemorySessionStore:
+    """Per-process session memory: LRU over sessions, capped per session and in total.
+
+    Each session keeps its last max_turns turns. Sessions idle for longer than ttl seconds
+    are dropped, and least recently used sessions are evicted whenever the stored text goes
+    over max_bytes.
+    """
+
+    def __init__(self, max_turns=20, ttl=1800.0, max_bytes=8 * 1024 * 1024, prune_interval=30.0):
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self.sessions = OrderedDict()
+        self.bytes = 0
+        self.counters = Counter()
+        self._next_prune = 0.0
+        self._lock = threading.Lock()
+
+    def init(self):
+        pass
+
+    def _drop(self, session_id, reason):
+        session = self.sessions.pop(session_id)
+        self.bytes -= session.bytes
+        self.counters[reason] += 1
+
+    def _prune(self, now):
+        # Sessions are kept in last-seen order, so expired ones are all at the front
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.last_seen > now - self.ttl:
+                break
+            self._drop(session_id, "expired")
+        self._next_prune = now + self.prune_interval
+
+    def append(self, session_id, user_query, bot_response):
+        size = turn_size(user_query, bot_response)
+        now = time.monotonic()
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = _Session(self.max_turns)
+            self.sessions.move_to_end(session_id)
+            if len(session.turns) == session.turns.maxlen:
+                dropped = session.turns[0]
+                removed = turn_size(*dropped)
+                session.bytes -= removed
+                self.bytes -= removed
+                self.counters["trimmed_turns"] += 1
+            session.turns.append((user_query, bot_response))
+            session.bytes += size
+            session.total += 1
+            session.last_seen = now
+            self.bytes += size
+            self.counters["appended"] += 1
+            if now >= self._next_prune:
+                self._prune(now)
+            while self.bytes > self.max_bytes and len(self.sessions) > 1:
+                self._drop(next(iter(self.sessions)), "evicted")
+
+    def turns(self, session_id, limit=None):
+        """Stored (user_query, bot_response) pairs, oldest first."""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return []
+            if session.last_seen <= time.monotonic() - self.ttl:
+                self._drop(session_id, "expired")
+                return []
+            turns = list(session.turns)
+        return turns[-limit:] if limit else turns
+
+    def window(self, session_id, max_turns=3, max_chars=1500):
+        with self._lock:
+            session = self.sessions.get(session_id)
+            total = session.total if session is not None else 0
+        turns = self.turns(session_id, max_turns)
+        return render_window(turns, earlier=max(0, total - len(turns)), max_chars=max_chars)
+
+    def clear(self, session_id):
+        with self._lock:
+            if session_id in self.sessions:
+                self._drop(session_id, "cleared")
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "backend": MEMORY, "sessions": len(self.sessions), "bytes": self.bytes}
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_turn (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    created REAL NOT NULL,
+    user_query TEXT NOT NULL,
+    bot_response TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_turn_session ON session_turn (session_id, id);
+CREATE TABLE IF NOT EXISTS session_state (
+    session_id TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL,
+    turns INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_state_last_seen ON session_state (last_seen);
+"""
+
+
+class SqliteSessionStore:
+    """Session memory in the application database, shared by every worker process.
+
+    Same limits as MemorySessionStore. Idle sessions are dropped lazily on read and by a
+    periodic prune, which also evicts the least recently seen sessions while the total
+    stored text is over max_bytes. Timestamps are wall-clock so all processes agree.
+    """
+
+    def __init__(self, db, max_turns=20, ttl=1800.0, max_bytes=64 * 1024 * 1024, prune_interval=30.0):
+        self.db = db
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self.counters = Counter()
+        self._next_prune = 0.0
+        self._prune_lock = threading.Lock()
+
+    def init(self):
+        self.db.executescript(SCHEMA)
+
+    def append(self, session_id, user_query, bot_response):
+        size = turn_size(user_query, bot_response)
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO session_turn (session_id, created, user_query, bot_response, size) VALUES (?, ?, ?, ?, ?)",
+                (session_id, now, user_query, bot_response, size)
+            )
+            turns, = conn.execute("""
+                INSERT INTO session_state (session_id, last_seen, turns, total, bytes) VALUES (?, ?, 1, 1, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    last_seen = excluded.last_seen, turns = turns + 1, total = total + 1, bytes = bytes + excluded.bytes
+                RETURNING turns
+            """, (session_id, now, size)).fetchone()
+            if turns > self.max_turns:
+                surplus = conn.execute(
+                    "SELECT id, size FROM session_turn WHERE session_id = ? ORDER BY id LIMIT ?",
+                    (session_id, turns - self.max_turns)
+                ).fetchall()
+                conn.executemany("DELETE FROM session_turn WHERE id = ?", [(row_id,) for row_id, _ in surplus])
+                conn.execute(
+                    "UPDATE session_state SET turns = turns - ?, bytes = bytes - ? WHERE session_id = ?",
+                    (len(surplus), sum(s for _, s in surplus), session_id)
+                )
+                self.counters["trimmed_turns"] += len(surplus)
+        self.counters["appended"] += 1
+        if time.monotonic() >= self._next_prune:
+            self.prune()
+
+    def _delete_sessions(self, conn, session_ids):
+        params = [(s,) for s in session_ids]
+        conn.executemany("DELETE FROM session_turn WHERE session_id = ?", params)
+        conn.executemany("DELETE FROM session_state WHERE session_id = ?", params)
+
+    def prune(self):
+        """Drop expired sessions, then the least recently seen ones while over max_bytes."""
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_prune = time.monotonic() + self.prune_interval
+            with self.db.transaction() as conn:
+                expired = [s for s, in conn.execute(
+                    "SELECT session_id FROM session_state WHERE last_seen <= ?", (time.time() - self.ttl,)
+                )]
+                self._delete_sessions(conn, expired)
+                self.counters["expired"] += len(expired)
+
+                total, = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM session_state").fetchone()
+                evicted = []
+                if total > self.max_bytes:
+                    for session_id, size in conn.execute("SELECT session_id, bytes FROM session_state ORDER BY last_seen"):
+                        if total <= self.max_bytes:
+                            break
+                        evicted.append(session_id)
+                        total -= size
+                    self._delete_sessions(conn, evicted)
+                self.counters["evicted"] += len(evicted)
+        finally:
+            self._prune_lock.release()
+
+    def _state(self, session_id):
+        row = self.db.query_one("SELECT last_seen, total FROM session_state WHERE session_id = ?", (session_id,))
+        if row is None:
+            return None
+        if row[0] <= time.time() - self.ttl:
+            self.clear(session_id)
+            self.counters["expired"] += 1
+            return None
+        return row
+
+    def turns(self, session_id, limit=None):
+        """Stored (user_query, bot_response) pairs, oldest first."""
+        if self._state(session_id) is None:
+            return []
+        _, rows = self.db.query(
+            "SELECT user_query, bot_response FROM session_turn WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, limit or self.max_turns)
+        )
+        return [tuple(row) for row in reversed(rows)]
+
+    def window(self, session_id, max_turns=3, max_chars=1500):
+        state = self._state(session_id)
+        if state is None:
+            return ""
+        turns = self.turns(session_id, max_turns)
+        return render_window(turns, earlier=max(0, state[1] - len(turns)), max_chars=max_chars)
+
+    def clear(self, session_id):
+        with self.db.transaction() as conn:
+            self._delete_sessions(conn, [session_id])
+
+    def stats(self):
+        sessions, stored = self.db.query_one("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM session_state")
+        return {**self.counters, "backend": SQLITE, "sessions": sessions, "bytes": stored}
+
+
+def make_session_store(backend, db=None, **limits):
+    if backend == MEMORY:
+        return MemorySessionStore(**limits)
+    if backend == SQLITE:
+        return SqliteSessionStore(db, **limits)
+    raise ValueError(f"session store backend must be one of {BACKENDS}, got {backend!r}")
@@ -0,0 +1,215 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+# Functions an LLM-written query has no business calling; the blob builders can allocate
+# up to SQLITE_LIMIT_LENGTH bytes in one call
+DENIED_FUNCTIONS = frozenset({"load_extension", "randomblob", "zeroblob", "readfile", "writefile"})
+
+COMMENT_OR_STRING_RE = re.compile(r"--[^\n]*|/\*.*?(?:\*/|$)|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"", re.DOTALL)
+FULL_SCAN_RE = re.compile(r"^SCAN (\w+)", re.IGNORECASE)
+# `FROM table [AS] alias` / `JOIN table alias`: query plans name tables by their alias
+TABLE_ALIAS_RE = re.compile(r"\b(?:from|join)\s+(\w+)(?:\s+(?:as\s+)?(\w+))?", re.IGNORECASE)
+NOT_ALIASES = frozenset("""
+where join inner left right full outer cross natural on using group order limit having
+union intersect except window as
+""".split())
+
+
+class SqlRejected(sqlite3.DatabaseError):
+    """The statement was refused before (or stopped during) execution."""
+
+    def __init__(self, reason, detail):
+        super().__init__(f"{detail} ({reason})")
+        self.reason = reason
+
+
+class QueryResult(list):
+    """Rows as dicts; `truncated` is set when more than max_rows rows matched.
+
+    `fallback` is set by callers that answered from a fallback search instead of the statement.
+    """
+
+    truncated = False
+    fallback = False
+
+
+def strip_literals(sql):
+    """sql with comments removed and string/identifier literals blanked, for keyword checks."""
+    return COMMENT_OR_STRING_RE.sub(lambda m: " " if m.group().startswith(("-", "/")) else "''", sql)
+
+
+def strip_trailing(sql):
+    """sql without the whitespace, semicolons and comments after its last token."""
+    end = pos = 0
+    for match in [*COMMENT_OR_STRING_RE.finditer(sql), None]:
+        gap = sql[pos:match.start() if match else len(sql)].rstrip(" \t\r\n;")
+        if gap.strip():
+            end = pos + len(gap)
+        if match is None:
+            break
+        if not match.group().startswith(("-", "/")):
+            end = match.end()
+        pos = match.end()
+    return sql[:end]
+
+
+def table_aliases(bare_sql):
+    aliases = {}
+    for table, alias in TABLE_ALIAS_RE.findall(bare_sql):
+        aliases[table.lower()] = table.lower()
+        if alias and alias.lower() not in NOT_ALIASES:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+def check_shape(sql):
+    """Require exactly one SELECT/WITH statement; returns it without trailing semicolons or comments."""
+    statement = strip_trailing(sql).strip()
+    bare = strip_literals(statement).strip()
+    if not re.match(r"(select|with)\b", bare, re.IGNORECASE):
+        raise SqlRejected("not_select", "only SELECT statements are allowed")
+    if ";" in bare:
+        raise SqlRejected("multiple_statements", "only one statement is allowed")
+    return statement
+
+
+class SqlGuard:
+    """Runs untrusted (LLM-written) SELECTs on dedicated read-only connections.
+
+    Before anything runs, a statement must be a single SELECT that only reads
+    `allowed_tables` (enforced by an SQLite authorizer at prepare time, not by regex), and
+    its EXPLAIN QUERY PLAN must not full-scan a table with more than scan_row_limit rows.
+    While it runs, a progress handler aborts it after timeout_ms, and at most max_rows
+    rows are fetched.
+    """
+
+    def __init__(self, db, allowed_tables, timeout_ms=250, max_rows=50, scan_row_limit=50000,
+                 max_value_bytes=1_000_000, count_ttl=60.0):
+        self.db = db
+        self.allowed_tables = frozenset(t.lower() for t in allowed_tables)
+        self.timeout = timeout_ms / 1000
+        self.max_rows = max_rows
+        self.scan_row_limit = scan_row_limit
+        self.max_value_bytes = max_value_bytes
+        self.count_ttl = count_ttl
+        self.counters = Counter()
+        self._counts = {}
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _authorize(self, action, arg1, arg2, db_name, trigger):
+        if action == sqlite3.SQLITE_SELECT:
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_READ:
+            # Only real tables: a CTE may shadow a table's name (WITH chat_log AS ... FROM main.chat_log)
+            if arg1 and arg1.lower() in self.allowed_tables:
+                return sqlite3.SQLITE_OK
+            self._local.denied = f"table {arg1!r} is not allowed"
+            return sqlite3.SQLITE_DENY
+        if action == sqlite3.SQLITE_FUNCTION:
+            if arg2 and arg2.lower() in DENIED_FUNCTIONS:
+                self._local.denied = f"function {arg2}() is not allowed"
+                return sqlite3.SQLITE_DENY
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_RECURSIVE:
+            return sqlite3.SQLITE_OK
+        self._local.denied = "statement is not read-only"
+        return sqlite3.SQLITE_DENY
+
+    def _progress(self):
+        deadline = getattr(self._local, "deadline", None)
+        return 1 if deadline is not None and time.perf_counter() > deadline else 0
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.db.connect()
+            conn.execute("PRAGMA query_only = ON")
+            conn.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, self.max_value_bytes)
+            conn.set_authorizer(self._authorize)
+            conn.set_progress_handler(self._progress, 1000)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _row_count(self, conn, table):
+        cached = self._counts.get(table)
+        now = time.monotonic()
+        if cached is None or cached[1] < now:
+            count = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            cached = self._counts[table] = (count, now + self.count_ttl)
+        return cached[0]
+
+    def _prepare_error(self, e):
+        denied = getattr(self._local, "denied", None)
+        self._local.denied = None
+        if denied or "not authorized" in str(e):
+            return SqlRejected("not_allowed", denied or str(e))
+        if "one statement at a time" in str(e):
+            return SqlRejected("multiple_statements", "only one statement is allowed")
+        return e
+
+    def screen(self, conn, sql, params):
+        """EXPLAIN QUERY PLAN check: refuse full scans of tables above scan_row_limit."""
+        try:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except sqlite3.Error as e:
+            raise self._prepare_error(e) from e
+        aliases = table_aliases(strip_literals(sql))
+        for row in plan:
+            match = FULL_SCAN_RE.match(row[-1])
+            table = match and aliases.get(match.group(1).lower(), match.group(1).lower())
+            if table in self.allowed_tables:
+                rows = self._row_count(conn, table)
+                if rows > self.scan_row_limit:
+                    raise SqlRejected("full_scan", f"query would scan all {rows} rows of {table}")
+
+    def run(self, sql, params=()):
+        """Validate and execute sql; returns a QueryResult or raises SqlRejected/sqlite3.Error."""
+        try:
+            statement = check_shape(sql)
+            conn = self.connection()
+            self._local.denied = None
+            self.screen(conn, statement, params)
+            self._local.deadline = time.perf_counter() + self.timeout
+            try:
+                try:
+                    cursor = conn.execute(statement, params)
+                except sqlite3.Error as e:
+                    raise self._prepare_error(e) from e
+                cols = [d[0] for d in cursor.description]
+                rows = cursor.fetchmany(self.max_rows + 1)
+                cursor.close()
+            except sqlite3.OperationalError as e:
+                if "interrupted" in str(e):
+                    raise SqlRejected("timeout", f"query ran longer than {self.timeout * 1000:.0f} ms") from e
+                raise
+            finally:
+                self._local.deadline = None
+        except SqlRejected as e:
+            self.counters[f"rejected_{e.reason}"] += 1
+            raise
+        result = QueryResult(dict(zip(cols, row)) for row in rows[:self.max_rows])
+        if len(rows) > self.max_rows:
+            result.truncated = True
+            self.counters["truncated"] += 1
+        self.counters["executed"] += 1
+        return result
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def stats(self):
+        return {**self.counters, "timeout_ms": round(self.timeout * 1000), "max_rows": self.max_rows}
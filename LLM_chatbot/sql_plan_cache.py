@@ -0,0 +1,157 @@
+import re
+import sqlite3
+import threading
+from collections import Counter, OrderedDict, namedtuple
+
+# A cached plan: the intent it answers, SQL with ? placeholders and, per placeholder,
+# (slot index, prefix, suffix) so LIKE patterns such as '%{product}%' survive
+Plan = namedtuple("Plan", ["intent", "sql", "param_specs"])
+
+ORDER_ID_RE = re.compile(r"\bORD\d+\b", re.IGNORECASE)
+NUMBER_RE = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+STRING_LITERAL_RE = re.compile(r"'((?:[^']|'')*)'")
+
+
+class SqlPlanCache:
+    """Maps question templates (literals pulled out) to validated, parameterized SQL.
+
+    "status of ORD1234" and "status of ORD5678" share the template "status of {order_id}",
+    so once the LLM has written SQL for one of them, the other runs the same statement with
+    a different bound parameter and skips the LLM.
+    """
+
+    def __init__(self, db, entity_source=None, max_entries=1024, run_query=None):
+        self.db = db
+        self.entity_source = entity_source  # anything with a .product_names list, e.g. FastRouter
+        # (sql, params) -> rows for the check in learn(); pass SqlGuard.run for LLM-written SQL
+        self.run_query = run_query or db.query_dicts
+        self.max_entries = max_entries
+        self.plans = OrderedDict()
+        self.counters = Counter()
+        self.saved_llm_seconds = 0.0
+        self.llm_seconds_ewma = None
+        self._product_names = None
+        self._product_re = None
+        self._canonical = {}
+        self._lock = threading.Lock()
+
+    def _products_regex(self):
+        names = self.entity_source.product_names if self.entity_source is not None else []
+        if names is not self._product_names:
+            alternation = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True) if n)
+            self._product_re = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE) if alternation else None
+            self._canonical = {n.lower(): n for n in names}
+            self._product_names = names
+        return self._product_re
+
+    def extract(self, question):
+        """Return (template, slots): the question with literals replaced and the literal values."""
+        slots = []
+
+        def replace(kind, value):
+            slots.append(value)
+            return f"{{{kind}}}"
+
+        text = ORDER_ID_RE.sub(lambda m: replace("order_id", m.group().upper()), question)
+        product_re = self._products_regex()
+        if product_re is not None:
+            text = product_re.sub(lambda m: replace("product", self._canonical[m.group().lower()]), text)
+        text = NUMBER_RE.sub(lambda m: replace("number", float(m.group()) if "." in m.group() else int(m.group())), text)
+        template = " ".join(re.findall(r"\{\w+\}|[a-z0-9]+", text.lower()))
+        return template, slots
+
+    def lookup(self, question):
+        """Return (plan, params) for a known template, else None."""
+        template, slots = self.extract(question)
+        with self._lock:
+            plan = self.plans.get(template) if slots else None
+            if plan is None:
+                self.counters["misses"] += 1
+                return None
+            self.plans.move_to_end(template)
+            self.counters["hits"] += 1
+            if self.llm_seconds_ewma is not None:
+                self.saved_llm_seconds += self.llm_seconds_ewma
+        params = tuple(f"{prefix}{slots[i]}{suffix}" if prefix or suffix else slots[i]
+                       for i, prefix, suffix in plan.param_specs)
+        return plan, params
+
+    def record_llm_time(self, seconds):
+        with self._lock:
+            if self.llm_seconds_ewma is None:
+                self.llm_seconds_ewma = seconds
+            else:
+                self.llm_seconds_ewma = 0.8 * self.llm_seconds_ewma + 0.2 * seconds
+
+    def parameterize(self, sql, slots):
+        """Replace each slot value in sql with ?; None unless every slot was found."""
+        specs, used = [], set()
+        lowered = [str(s).lower() for s in slots]
+
+        def literal(m):
+            body = m.group(1)
+            for i, value in enumerate(lowered):
+                pos = body.lower().find(value)
+                if pos != -1 and set(body[:pos] + body[pos + len(value):]) <= {"%", "_"}:
+                    specs.append((i, body[:pos], body[pos + len(value):]))
+                    used.add(i)
+                    return "?"
+            return m.group()
+
+        def number(m):
+            if m.group() in lowered:
+                i = lowered.index(m.group())
+                specs.append((i, "", ""))
+                used.add(i)
+                return "?"
+            return m.group()
+
+        # Strings first, then bare numbers outside of string literals
+        pieces = re.split(r"('(?:[^']|'')*')", sql)
+        out = []
+        for piece in pieces:
+            if piece.startswith("'"):
+                out.append(STRING_LITERAL_RE.sub(literal, piece))
+            else:
+                out.append(NUMBER_RE.sub(number, piece))
+        if used != set(range(len(slots))):
+            return None
+        return "".join(out), tuple(specs)
+
+    def learn(self, question, intent, sql, expected_rows):
+        """Store a plan for question's template if the parameterized SQL reproduces expected_rows."""
+        if not re.match(r"\s*(select|with)\b", sql, re.IGNORECASE):
+            return False
+        template, slots = self.extract(question)
+        if not slots:
+            return False
+        result = self.parameterize(sql, slots)
+        if result is None:
+            self.counters["rejected"] += 1
+            return False
+        param_sql, specs = result
+        params = tuple(f"{p}{slots[i]}{s}" if p or s else slots[i] for i, p, s in specs)
+        try:
+            rows = self.run_query(param_sql, params)
+        except sqlite3.Error:
+            self.counters["rejected"] += 1
+            return False
+        if rows != expected_rows:
+            self.counters["rejected"] += 1
+            return False
+        with self._lock:
+            self.plans[template] = Plan(intent, param_sql, specs)
+            self.plans.move_to_end(template)
+            while len(self.plans) > self.max_entries:
+                self.plans.popitem(last=False)
+            self.counters["learned"] += 1
+        return True
+
+    def stats(self):
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "plans": len(self.plans),
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            "saved_llm_seconds": round(self.saved_llm_seconds, 3),
+        }
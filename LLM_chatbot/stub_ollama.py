@@ -0,0 +1,118 @@
+"""Minimal stand-in for Ollama's /api/generate, for local testing without llama2.
+
+    python stub_ollama.py --port 11434 --latency 0.2 --token-delay 0.01
+    OLLAMA_URL=http://localhost:11434 uvicorn app:app
+
+Intent prompts get a keyword-based label and SQL prompts get canned SQL, so the
+whole /chat pipeline can run offline with a configurable, repeatable latency.
+"""
+import argparse
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INTENT_KEYWORDS = [
+    ("order_status", ("order", "ord", "status", "shipped", "delivered")),
+    ("product_info", ("price", "cost", "product", "features", "galaxy", "iphone", "macbook", "pixel")),
+    ("faq", ("return", "refund", "warranty", "invoice", "password", "emi")),
+    ("goodbye", ("bye", "goodbye")),
+    ("greeting", ("good morning", "good evening", "greetings")),
+]
+
+
+def canned_intent(question):
+    q = question.lower()
+    for label, words in INTENT_KEYWORDS:
+        if any(w in q for w in words):
+            return label
+    return "unknown"
+
+
+def canned_sql(question):
+    order = re.search(r"\bORD\d+\b", question, re.IGNORECASE)
+    if order:
+        return f"SELECT * FROM order_status WHERE order_id = '{order.group().upper()}'"
+    if canned_intent(question) == "product_info":
+        words = [w for w in re.findall(r"[A-Za-z0-9]+", question) if w[0].isupper() or w[0].isdigit()]
+        if words:
+            return f"SELECT * FROM product_info WHERE name LIKE '%{' '.join(words[:2])}%'"
+        return "SELECT * FROM product_info"
+    return "SELECT department, phone, email FROM support_contacts"
+
+
+def last_user_line(prompt):
+    users = re.findall(r"^User: (.*)$", prompt, re.MULTILINE)
+    return users[-1] if users else prompt
+
+
+def canned_response(prompt):
+    question = last_user_line(prompt)
+    if "INTENT:" in prompt:
+        intent = canned_intent(question)
+        sql = canned_sql(question) if intent in ("product_info", "order_status", "faq") else "NONE"
+        return f"INTENT: {intent}\nSQL: {sql}"
+    if "Classify" in prompt:
+        return canned_intent(question)
+    if "SQL" in prompt:
+        return canned_sql(question)
+    return "OK"
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    token_delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        text = canned_response(body.get("prompt", ""))
+        time.sleep(self.latency)
+
+        if not body.get("stream", True):
+            payload = json.dumps({"model": body.get("model"), "response": text, "done": True}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in re.findall(r"\S+\s*|\s+", text):
+            self._write_chunk({"response": token, "done": False})
+            time.sleep(self.token_delay)
+        self._write_chunk({"response": "", "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def make_server(host="127.0.0.1", port=11434, latency=0.0, token_delay=0.0):
+    handler = type("ConfiguredStubOllamaHandler", (StubOllamaHandler,),
+                   {"latency": latency, "token_delay": token_delay})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.latency, args.token_delay)
+    print(f"Stub Ollama listening on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,40 @@
+# Per-table change counters maintained by triggers, so long-running processes can
+# cheaply notice that a table they cached (FAQ index, router entities, ...) changed.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS table_version (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+VERSION_TRIGGERS = """
+INSERT OR IGNORE INTO table_version (table_name, version) VALUES ('{table}', 0);
+CREATE TRIGGER IF NOT EXISTS {table}_version_ins AFTER INSERT ON {table} BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = '{table}';
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_version_upd AFTER UPDATE ON {table} BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = '{table}';
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_version_del AFTER DELETE ON {table} BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = '{table}';
+END;
+"""
+
+
+def track_table_versions(conn, tables):
+    conn.executescript(SCHEMA)
+    for table in tables:
+        conn.executescript(VERSION_TRIGGERS.format(table=table))
+
+
+def get_table_version(conn, table):
+    row = conn.execute("SELECT version FROM table_version WHERE table_name = ?", (table,)).fetchone()
+    return row[0] if row else 0
+
+
+def get_table_versions(conn, tables):
+    placeholders = ", ".join("?" for _ in tables)
+    versions = dict(conn.execute(
+        f"SELECT table_name, version FROM table_version WHERE table_name IN ({placeholders})", tuple(tables)
+    ))
+    return tuple(versions.get(table, 0) for table in tables)
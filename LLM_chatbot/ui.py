@@ -1,18 +1,52 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import base64
+import json
+import os
 import uuid
 
-def get_base64_image_from_url(url):
-    response = requests.get(url)
-    return base64.b64encode(response.content).decode()
+API_URL = os.getenv("CHATBOT_API_URL", "http://localhost:8000").rstrip("/")
+# (connect, read) seconds; the read timeout is per chunk, so long streamed replies are fine
+API_TIMEOUT = (float(os.getenv("CHATBOT_CONNECT_TIMEOUT", "5")), float(os.getenv("CHATBOT_READ_TIMEOUT", "120")))
+# Only the most recent messages are rendered on each rerun; older ones stay in the session
+HISTORY_WINDOW = int(os.getenv("CHATBOT_HISTORY_WINDOW", "20"))
+MAX_HISTORY = int(os.getenv("CHATBOT_MAX_HISTORY", "200"))
 
 icon_url = "https://img.freepik.com/premium-vector/chatbot-concept-background-realistic-style_730620-44319.jpg"
-chatbot_icon_b64 = get_base64_image_from_url(icon_url)
+ICON_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot_icon.jpg")
+
+# Streamlit reruns this script on every interaction; cache_resource keeps these for the
+# life of the process instead of rebuilding them each time. No spinners: the icon is
+# loaded before set_page_config, which must be the first Streamlit command
+
+@st.cache_resource(show_spinner=False)
+def http_session():
+    """One pooled, keep-alive HTTP session shared by all reruns and browser sessions."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource(show_spinner=False)
+def get_base64_icon(url, path=ICON_FILE):
+    """The page icon as base64: from a local file if present, else downloaded once. None if neither works."""
+    try:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return base64.b64encode(f.read()).decode()
+        response = http_session().get(url, timeout=API_TIMEOUT)
+        response.raise_for_status()
+        return base64.b64encode(response.content).decode()
+    except (OSError, requests.RequestException):
+        return None
+
+chatbot_icon_b64 = get_base64_icon(icon_url)
 
 st.set_page_config(
     page_title="LLAMA2 Chatbot",
-    page_icon=f"data:image/jpeg;base64,{chatbot_icon_b64}",
+    page_icon=f"data:image/jpeg;base64,{chatbot_icon_b64}" if chatbot_icon_b64 else "🦙",
     layout="centered"
 )
 
@@ -59,7 +93,37 @@ st.markdown(f"""
 st.title("🦙 LLaMA2 Chatbot")
 st.markdown("Ask me anything related to orders, pricing, tech support, and more!")
 
-API_URL = "http://localhost:8000/chat"
+def stream_reply(prompt, result):
+    """Yield the bot reply chunk by chunk from POST /chat/stream; the full reply ends up in result["reply"]."""
+    body = {"session_id": st.session_state.session_id, "prompt": prompt}
+    try:
+        with http_session().post(f"{API_URL}/chat/stream", json=body, stream=True, timeout=API_TIMEOUT) as res:
+            if res.headers.get("content-type", "").startswith("application/json"):
+                # Refused before streaming started (e.g. 503 when the server is busy)
+                result["reply"] = res.json().get("response", f"⚠️ Server returned {res.status_code}.")
+                yield result["reply"]
+                return
+            res.raise_for_status()
+            event = None
+            for line in res.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "reply":
+                        yield data["text"]
+                    elif event == "done":
+                        result["reply"] = data["response"]
+    except (requests.RequestException, ValueError) as e:
+        result["reply"] = f"⚠️ Could not reach the chatbot API: {e}"
+        yield result["reply"]
+
+def render_history(history):
+    hidden = len(history) - HISTORY_WINDOW
+    if hidden > 0:
+        st.caption(f"{hidden} earlier messages not shown")
+    for sender, msg in history[-HISTORY_WINDOW:]:
+        st.markdown(f"**{sender}:** {msg}")
 
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
@@ -69,15 +133,18 @@ if "session_id" not in st.session_state:
 user_input = st.text_input("💬 Your Message", key="input_text")
 
 if st.button("Send") and user_input:
+    st.session_state.chat_history.append(("You", user_input))
+    render_history(st.session_state.chat_history)
+    result = {}
     with st.spinner("Thinking..."):
-        res = requests.post(API_URL, json={"session_id": st.session_state.session_id, "prompt": user_input})
-        bot_reply = res.json()["response"]
-        st.session_state.chat_history.append(("You", user_input))
-        st.session_state.chat_history.append(("Bot", bot_reply))
-
-if st.session_state.chat_history:
-    for sender, msg in st.session_state.chat_history:
-        st.markdown(f"**{sender}:** {msg}")
+        with st.empty():
+            streamed = st.write_stream(stream_reply(user_input, result))
+            bot_reply = result.get("reply", streamed if isinstance(streamed, str) else "")
+            st.markdown(f"**Bot:** {bot_reply}")
+    st.session_state.chat_history.append(("Bot", bot_reply))
+    del st.session_state.chat_history[:-MAX_HISTORY]
+elif st.session_state.chat_history:
+    render_history(st.session_state.chat_history)
 
 st.sidebar.markdown("---")
 if st.sidebar.button("🧹 Clear Chat"):